@@ -0,0 +1,80 @@
+# Aggregate speed and exactness of integer-cents amounts against the old REAL column.
+#
+#   python benchmarks/amount_totals.py --rows 10000000
+#
+# Builds two copies of a synthetic expenditures table in a temporary database, one with
+# amount_cents INTEGER and one with amount REAL, then times the same totals on both and checks
+# them against the exact total computed in Python.
+import argparse
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projexp-reporting.py")
+
+# Deterministic amounts in cents, so the expected total can be computed independently
+AMOUNT_SQL = "(i * 7919) % 1000000"
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("projexp_reporting", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(conn, sql):
+    start = time.perf_counter()
+    rows = conn.execute(sql).fetchall()
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integer cents vs REAL amounts")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    app = load_app()
+    with tempfile.TemporaryDirectory() as workdir:
+        conn = sqlite3.connect(os.path.join(workdir, "bench.db"))
+        start = time.perf_counter()
+        for table_name, amount_column, amount_value in (
+            ("cents", "amount_cents INTEGER", AMOUNT_SQL),
+            ("reals", "amount REAL", f"({AMOUNT_SQL}) / 100.0"),
+        ):
+            conn.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY, project TEXT, year INTEGER, quarter INTEGER, {amount_column})")
+            conn.execute(f'''
+                WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+                INSERT INTO {table_name} (project, year, quarter, {amount_column.split()[0]})
+                SELECT 'Project ' || (i % 10), 2015 + i % 10, 1 + i % 4, {amount_value} FROM n
+            ''', (args.rows,))
+        conn.commit()
+        print(f"{args.rows} rows per table, generated in {time.perf_counter() - start:.1f} s")
+
+        expected = sum((i * 7919) % 1000000 for i in range(1, args.rows + 1))
+        rows, cents_time = timed(conn, "SELECT SUM(amount_cents) FROM cents")
+        cents_total = rows[0][0]
+        rows, real_time = timed(conn, "SELECT SUM(amount) FROM reals")
+        real_total = rows[0][0]
+        print(f"SUM over all rows      cents {cents_time:6.2f} s   REAL {real_time:6.2f} s")
+        print(f"  expected {app.format_amount(expected)}")
+        print(f"  cents    {app.format_amount(cents_total)}   exact: {cents_total == expected}")
+        print(f"  REAL     {real_total!r}   exact: {Decimal(real_total) * 100 == expected}")
+
+        _, cents_time = timed(conn, "SELECT project, year, quarter, SUM(amount_cents) FROM cents GROUP BY project, year, quarter")
+        _, real_time = timed(conn, "SELECT project, year, quarter, SUM(amount) FROM reals GROUP BY project, year, quarter")
+        print(f"GROUP BY project/year/quarter   cents {cents_time:6.2f} s   REAL {real_time:6.2f} s")
+
+        # The classic case: a million ten-cent items
+        tenths = min(args.rows, 1_000_000)
+        cents_tenths = conn.execute("SELECT SUM(10) FROM cents WHERE id <= ?", (tenths,)).fetchone()[0]
+        real_tenths = conn.execute("SELECT SUM(0.1) FROM reals WHERE id <= ?", (tenths,)).fetchone()[0]
+        print(f"{tenths} x 0.10        cents {cents_tenths} (= {app.format_amount(cents_tenths)})   REAL {real_tenths!r}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
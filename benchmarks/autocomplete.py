@@ -0,0 +1,72 @@
+# Per-keystroke latency of the metadata type-ahead (PrefixIndex) at 100k values.
+#
+#   python benchmarks/autocomplete.py --values 100000
+#
+# Simulates typing each of a sample of existing values one character at a time and times the
+# lookup done on every keystroke, next to a plain scan of the whole list for comparison.
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import string
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projexp-reporting.py")
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("projexp_reporting", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99)]
+    print(f"{label:<14} median {statistics.median(samples) * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us   max {samples[-1] * 1e6:9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Type-ahead latency per keystroke")
+    parser.add_argument("--values", type=int, default=100_000)
+    parser.add_argument("--typed", type=int, default=1_000, help="number of values typed out")
+    args = parser.parse_args()
+
+    app = load_app()
+    rng = random.Random(0)
+    values = list({
+        f"{rng.choice(string.ascii_uppercase)}{''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))} {rng.randint(1, 999)}"
+        for _ in range(args.values)
+    })
+
+    start = time.perf_counter()
+    index = app.PrefixIndex(values)
+    print(f"{len(values)} values, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    indexed, scanned = [], []
+    for value in rng.sample(values, args.typed):
+        for length in range(1, len(value) + 1):
+            prefix = value[:length]
+            start = time.perf_counter()
+            index.matches(prefix, app.AUTOCOMPLETE_LIMIT)
+            indexed.append(time.perf_counter() - start)
+        for length in range(1, 4):
+            prefix = value[:length].casefold()
+            start = time.perf_counter()
+            [candidate for candidate in values if candidate.casefold().startswith(prefix)][:app.AUTOCOMPLETE_LIMIT]
+            scanned.append(time.perf_counter() - start)
+    summarize("PrefixIndex", indexed)
+    summarize("full scan", scanned)
+
+    added = []
+    for i in range(1_000):
+        start = time.perf_counter()
+        index.add(f"New partner {i}")
+        added.append(time.perf_counter() - start)
+    summarize("add", added)
+
+
+if __name__ == "__main__":
+    main()
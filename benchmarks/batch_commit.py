@@ -0,0 +1,96 @@
+# Commit latency of the batch-entry grid: save_batch() on 1,000 rows, against a database that
+# already has the app's indexes, change-log triggers and budget counters in place.
+#
+#   python benchmarks/batch_commit.py --rows 100000 --batch 1000
+#
+# Runs the real save_batch() SQL path without a window: the Tk-only refresh steps are stubbed out.
+# One commit per row (the old save-one-at-a-time path) is timed next to it for comparison.
+# Everything runs in a temporary directory, so the working database is never touched.
+import argparse
+import collections
+import importlib.util
+import os
+import random
+import statistics
+import tempfile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projexp-reporting.py")
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("projexp_reporting", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_tracker(app, path):
+    class HeadlessTracker(app.ProjectExpenditureTracker):
+        def __init__(self):
+            self.conn = app.open_connection(path)
+            self.project_trees = {}
+            self.metadata_index = collections.defaultdict(app.PrefixIndex)
+            self.create_tables()
+
+        def add_project_tab(self, project):
+            self.project_trees[project] = None
+
+        def load_data(self):
+            pass
+
+        def update_comboboxes(self):
+            pass
+
+    return HeadlessTracker()
+
+
+def make_records(rng, count, first_invoice, projects):
+    records = []
+    for i in range(count):
+        year = rng.randint(2019, 2024)
+        quarter = rng.randint(1, 4)
+        records.append((
+            f"{year}-{quarter * 3:02d}-15", f"Partner {rng.randrange(200)}", rng.choice(projects), year, quarter,
+            f"INV-{first_invoice + i}", rng.randint(100, 10_000_000), f"Category {rng.randrange(20)}", f"Source {rng.randrange(5)}",
+        ))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save_batch commit latency")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows already in the database")
+    parser.add_argument("--batch", type=int, default=1_000, help="rows per batch")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=20)
+    args = parser.parse_args()
+
+    app = load_app()
+    rng = random.Random(0)
+    projects = [f"Project {i}" for i in range(args.projects)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracker = make_tracker(app, os.path.join(directory, "bench.db"))
+        tracker.save_batch(make_records(rng, args.rows, 0, projects))
+        tracker.conn.execute("DELETE FROM change_log")
+        tracker.conn.commit()
+
+        cursor = tracker.conn.cursor()
+        cursor.execute("SELECT type, COUNT(*) FROM sqlite_master WHERE type IN ('index', 'trigger') GROUP BY type")
+        counts = dict(cursor.fetchall())
+        print(f"{args.rows} rows in {args.projects} projects, {counts.get('index', 0)} indexes, {counts.get('trigger', 0)} triggers")
+
+        invoice = args.rows
+        batched = []
+        for _ in range(args.repeats):
+            batched.append(tracker.save_batch(make_records(rng, args.batch, invoice, projects)))
+            invoice += args.batch
+        print(f"save_batch, {args.batch} rows in one transaction: median {statistics.median(batched) * 1000:.1f} ms"
+              f"   max {max(batched) * 1000:.1f} ms")
+
+        single = [tracker.save_batch([record]) for record in make_records(rng, args.batch, invoice, projects)]
+        print(f"{args.batch} rows, one transaction each:        total {sum(single) * 1000:.1f} ms"
+              f"   median {statistics.median(single) * 1000:.2f} ms per row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Time to first paint and to a fully loaded view, cold and warm, on a synthetic database.
+#
+#   python benchmarks/first_paint.py --rows 200000
+#
+# Needs a display: the app is a Tk GUI and the timings are taken from a real window.
+# Everything runs in a temporary directory, so the working database is never touched.
+import argparse
+import importlib.util
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import tkinter as tk
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projexp-reporting.py")
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("projexp_reporting", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_database(app, path, rows, projects):
+    rng = random.Random(0)
+    project_names = [f"Project {i}" for i in range(projects)]
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE expenditures (
+            id INTEGER PRIMARY KEY, date TEXT, partner TEXT, project TEXT, year INTEGER, quarter INTEGER,
+            invoice_number TEXT, amount_cents INTEGER, category TEXT, fund_source TEXT
+        )
+    ''')
+    conn.execute("CREATE TABLE metadata (id INTEGER PRIMARY KEY, type TEXT, value TEXT)")
+    metadata = [("project", name) for name in project_names]
+    metadata += [("partner", f"Partner {i}") for i in range(200)]
+    metadata += [("category", f"Category {i}") for i in range(20)]
+    metadata += [("fund_source", f"Source {i}") for i in range(5)]
+    conn.executemany("INSERT INTO metadata (type, value) VALUES (?, ?)", metadata)
+
+    records = []
+    for i in range(rows):
+        year = rng.randint(2019, 2024)
+        quarter = rng.randint(1, 4)
+        records.append((
+            f"{year}-{quarter * 3:02d}-15", f"Partner {rng.randrange(200)}", rng.choice(project_names), year, quarter,
+            f"INV-{i}", rng.randint(100, 10_000_000), f"Category {rng.randrange(20)}", f"Source {rng.randrange(5)}",
+        ))
+    conn.executemany('''
+        INSERT INTO expenditures (date, partner, project, year, quarter, invoice_number, amount_cents, category, fund_source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', records)
+    for name in project_names:
+        table_name = f"project_{app.ProjectExpenditureTracker.sanitize_table_name(None, name)}"
+        conn.execute(f'''
+            CREATE TABLE {table_name} (
+                id INTEGER PRIMARY KEY, date TEXT, partner TEXT, year INTEGER, quarter INTEGER,
+                invoice_number TEXT, amount_cents INTEGER, category TEXT, fund_source TEXT
+            )
+        ''')
+        conn.executemany(
+            f"INSERT INTO {table_name} (date, partner, year, quarter, invoice_number, amount_cents, category, fund_source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [record[:2] + record[3:] for record in records if record[2] == name],
+        )
+    conn.commit()
+    conn.close()
+
+
+def launch(app, use_warm_start=True):
+    # Starts the app, pumps the event loop until the first paint and the full load have both
+    # happened, then closes it the normal way (which writes the warm-start snapshot if enabled)
+    root = tk.Tk()
+    tracker = app.ProjectExpenditureTracker(root, use_warm_start=use_warm_start)
+    while tracker.first_paint_ms is None or tracker.records_loaded_ms is None:
+        root.update()
+    result = (tracker.started_warm, tracker.first_paint_ms, tracker.records_loaded_ms)
+    tracker.on_close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first paint, cold and warm")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        sys.exit(f"This benchmark needs a display: {e}")
+
+    app = load_app()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        build_database(app, app.DB_PATH, args.rows, args.projects)
+        launch(app)  # one-time migrations, indexes and counters, not part of the timings
+
+        print(f"{args.rows} rows, {args.projects} projects")
+        for _ in range(args.repeat):
+            if os.path.exists(app.WARM_START_PATH):
+                os.remove(app.WARM_START_PATH)
+            _, first_paint_ms, records_loaded_ms = launch(app, use_warm_start=False)
+            print(f"off:  first paint {first_paint_ms:8.0f} ms   all records {records_loaded_ms:8.0f} ms")
+            for started_warm, first_paint_ms, records_loaded_ms in (launch(app), launch(app)):
+                kind = "warm" if started_warm else "cold"
+                print(f"{kind}: first paint {first_paint_ms:8.0f} ms   all records {records_loaded_ms:8.0f} ms")
+        os.chdir(os.path.dirname(APP_PATH))
+
+
+if __name__ == "__main__":
+    main()
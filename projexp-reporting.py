@@ -1,32 +1,651 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import argparse
+import bisect
 import sqlite3
+import sys
 import re
 import traceback
 import csv
 import os
+from collections import Counter, OrderedDict
+import json
+import queue
+import struct
+import threading
+import time
+from urllib.request import pathname2url
 
 #Database Connection
+DB_PATH = "project_expenditure.db"
+
+
+def format_amount(cents):
+    # Integer cents -> "1234.50"; the only place amounts become text
+    if cents is None:
+        return ""
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+def parse_amount(value):
+    # User or display text -> integer cents, exactly; rejects fractions of a cent
+    try:
+        cents = Decimal(str(value).replace(",", "").strip()) * 100
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not cents.is_finite() or cents != cents.to_integral_value():
+        raise ValueError(f"Invalid amount: {value!r}")
+    return int(cents)
+
+
+def open_connection(path=DB_PATH, read_only=False):
+    if read_only:
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(path)
+    conn.create_function("format_amount", 1, format_amount, deterministic=True)
+    return conn
+
+
+def create_schema(conn):
+    # Creates any missing tables, triggers and indexes and migrates older databases. Shared by the
+    # app and the command-line entry points, so a database is never read before it is migrated.
+    cursor = conn.cursor()
+
+    # Create main expenditures table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS expenditures (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            partner TEXT,
+            project TEXT,
+            year INTEGER,
+            quarter INTEGER,
+            invoice_number TEXT,
+            amount_cents INTEGER,
+            category TEXT,
+            fund_source TEXT
+        )
+    ''')
+
+    # Create metadata table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metadata (
+            id INTEGER PRIMARY KEY,
+            type TEXT,
+            value TEXT
+        )
+    ''')
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metadata_type_value ON metadata (type, value)")
+
+    # Create entry log table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS entry_log (
+            id INTEGER PRIMARY KEY,
+            expenditure_id INTEGER,
+            timestamp TEXT,
+            user TEXT,
+            FOREIGN KEY (expenditure_id) REFERENCES expenditures (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS edit_delete_log (
+            id INTEGER PRIMARY KEY,
+            action TEXT,
+            expenditure_id INTEGER,
+            old_data TEXT,
+            new_data TEXT,
+            timestamp TEXT,
+            user TEXT
+        )
+    ''')
+
+    conn.commit()
+    migrate_amounts_to_cents(conn)
+    # After the migration, which rebuilds expenditures and would drop its triggers
+    create_change_log(conn)
+    create_budget_tables(conn)
+
+    # Duplicate invoice checks look up (partner, invoice_number)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenditures_partner_invoice ON expenditures (partner, invoice_number)")
+    # Covering index for the comparison report: its GROUP BY is a single ordered index scan
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenditures_report ON expenditures (project, category, fund_source, year, quarter, amount_cents)")
+
+    conn.commit()
+    create_sort_indexes(conn, "expenditures")
+
+
+def migrate_amounts_to_cents(conn):
+    # Rebuilds any table still holding a REAL amount column with an INTEGER amount_cents column.
+    # SQLite can't change a column type in place, so each table is copied, all in one transaction.
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND (name = 'expenditures' OR name LIKE 'project_%')")
+    tables = [row[0] for row in cursor.fetchall()]
+
+    pending = []
+    for table_name in tables:
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        columns = [column[1] for column in cursor.fetchall()]
+        if "amount" in columns and "amount_cents" not in columns:
+            pending.append((table_name, columns))
+    if not pending:
+        return
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for table_name, columns in pending:
+            project_column = "project TEXT," if "project" in columns else ""
+            cursor.execute(f'''
+                CREATE TABLE {table_name}_migrated (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT,
+                    partner TEXT,
+                    {project_column}
+                    year INTEGER,
+                    quarter INTEGER,
+                    invoice_number TEXT,
+                    amount_cents INTEGER,
+                    category TEXT,
+                    fund_source TEXT
+                )
+            ''')
+            copied = [column for column in ("id", "date", "partner", "project", "year", "quarter", "invoice_number", "category", "fund_source") if column in columns]
+            cursor.execute(f'''
+                INSERT INTO {table_name}_migrated ({", ".join(copied)}, amount_cents)
+                SELECT {", ".join(copied)}, CAST(ROUND(amount * 100) AS INTEGER) FROM {table_name}
+            ''')
+            cursor.execute(f"DROP TABLE {table_name}")
+            cursor.execute(f"ALTER TABLE {table_name}_migrated RENAME TO {table_name}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def create_budget_tables(conn):
+    # budgets holds the planned amounts. budget_spent holds running spent-to-date totals for the
+    # same keys (quarter 0 = whole year), kept current by triggers on expenditures, so checking a
+    # budget is a primary-key lookup whatever the size of expenditures.
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS budgets (
+            project TEXT NOT NULL,
+            fund_source TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            quarter INTEGER NOT NULL DEFAULT 0,
+            amount_cents INTEGER NOT NULL,
+            PRIMARY KEY (project, fund_source, year, quarter)
+        )
+    ''')
+    conn.commit()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='budget_spent'")
+    if cursor.fetchone() is not None:
+        return
+
+    # First run: the counters, their triggers and the backfill land in one transaction,
+    # so no expenditure can be written between the backfill and the triggers taking over
+    def apply(row, sign):
+        # Adds (sign "+") or removes (sign "-") one expenditure row in its quarter and year counters
+        return f'''
+            INSERT INTO budget_spent (project, fund_source, year, quarter, spent_cents)
+            SELECT IFNULL({row}.project, ''), IFNULL({row}.fund_source, ''), {row}.year, period, {sign}IFNULL({row}.amount_cents, 0)
+            FROM (SELECT 0 AS period UNION ALL SELECT {row}.quarter WHERE {row}.quarter BETWEEN 1 AND 4)
+            WHERE {row}.year IS NOT NULL
+            ON CONFLICT (project, fund_source, year, quarter) DO UPDATE SET spent_cents = spent_cents + excluded.spent_cents;
+        '''
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute('''
+            CREATE TABLE budget_spent (
+                project TEXT NOT NULL,
+                fund_source TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                quarter INTEGER NOT NULL,
+                spent_cents INTEGER NOT NULL,
+                PRIMARY KEY (project, fund_source, year, quarter)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(f"CREATE TRIGGER budget_spent_insert AFTER INSERT ON expenditures BEGIN {apply('NEW', '+')} END")
+        cursor.execute(f'''
+            CREATE TRIGGER budget_spent_update AFTER UPDATE OF project, fund_source, year, quarter, amount_cents ON expenditures
+            BEGIN {apply('OLD', '-')} {apply('NEW', '+')} END
+        ''')
+        cursor.execute(f"CREATE TRIGGER budget_spent_delete AFTER DELETE ON expenditures BEGIN {apply('OLD', '-')} END")
+        cursor.execute('''
+            INSERT INTO budget_spent (project, fund_source, year, quarter, spent_cents)
+            SELECT IFNULL(project, ''), IFNULL(fund_source, ''), year, quarter, IFNULL(SUM(amount_cents), 0)
+            FROM expenditures WHERE year IS NOT NULL AND quarter BETWEEN 1 AND 4
+            GROUP BY 1, 2, 3, 4
+            UNION ALL
+            SELECT IFNULL(project, ''), IFNULL(fund_source, ''), year, 0, IFNULL(SUM(amount_cents), 0)
+            FROM expenditures WHERE year IS NOT NULL
+            GROUP BY 1, 2, 3
+        ''')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def create_sort_indexes(conn, table_name):
+    # Indexes the same IFNULL() expression used in ORDER BY, so an unfiltered sorted page on
+    # these columns is an index range scan; the rowid is implicitly part of each index.
+    # Runs when a table is created or rebuilt, not on every save.
+    cursor = conn.cursor()
+    for column in INDEXED_SORT_COLUMNS:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column} ON {table_name} (IFNULL({column}, ''))")
+    conn.commit()
+
+
+# Comparison report: groupable dimensions (column -> heading), in partition order
+REPORT_DIMENSIONS = {"project": "Project", "category": "Category", "fund_source": "Fund Source"}
+REPORT_TAB = "Comparison Report"
+
+
+def comparison_report(conn, dimensions=tuple(REPORT_DIMENSIONS)):
+    # Quarterly totals per dimension group with quarter-over-quarter and year-over-year changes,
+    # year-to-date and running totals, computed by SQLite in one pass with window functions.
+    # Amounts are integer cents. Returns (headers, rows).
+    dims = [dim for dim in REPORT_DIMENSIONS if dim in dimensions]
+    dim_select = "".join(f"{dim}, " for dim in dims)
+    series_partition = f"PARTITION BY {', '.join(dims)}" if dims else ""
+    quarter_partition = f"PARTITION BY {', '.join(dims + ['quarter'])}"
+    year_partition = f"PARTITION BY {', '.join(dims + ['year'])}"
+
+    # The base totals always follow idx_expenditures_report, so the full-table aggregation is an
+    # ordered index scan whatever the grouping; rolling up to fewer dimensions only touches those totals.
+    # A change is only reported against the directly preceding quarter / the same quarter last year;
+    # a gap in the data yields NULL rather than a comparison with an older period.
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        WITH base AS (
+            SELECT project, category, fund_source, year, quarter, SUM(amount_cents) AS total
+            FROM expenditures
+            GROUP BY project, category, fund_source, year, quarter
+        ),
+        totals AS (
+            SELECT {dim_select}year, quarter, SUM(total) AS total
+            FROM base
+            GROUP BY {dim_select}year, quarter
+        )
+        SELECT year, quarter, {dim_select}total,
+            CASE WHEN LAG(year * 4 + quarter) OVER series = year * 4 + quarter - 1
+                 THEN total - LAG(total) OVER series END,
+            CASE WHEN LAG(year) OVER same_quarter = year - 1
+                 THEN total - LAG(total) OVER same_quarter END,
+            SUM(total) OVER ({year_partition} ORDER BY quarter),
+            SUM(total) OVER series
+        FROM totals
+        WINDOW series AS ({series_partition} ORDER BY year, quarter),
+               same_quarter AS ({quarter_partition} ORDER BY year)
+        ORDER BY {dim_select}year, quarter
+    ''')
+    headers = ["Year", "Quarter"] + [REPORT_DIMENSIONS[dim] for dim in dims] + [
+        "Total", "QoQ Change", "YoY Change", "Year to Date", "Running Total"]
+    return headers, cursor.fetchall()
+
+
+def format_report_row(row, dimension_count):
+    # Cents -> text for the five amount columns that follow year, quarter and the dimensions
+    split = 2 + dimension_count
+    return tuple(row[:split]) + tuple(format_amount(value) for value in row[split:])
+
+
+# Reporting replica: a separate read-only copy of expenditures and metadata for heavy queries,
+# caught up from the change_log table in batches (see replica_path_for for where it lives)
+REPLICATION_INTERVAL_MS = 5000
+REPLICATION_BATCH = 1000
+REPLICATION_ID_CHUNK = 900  # rowids per IN (...) list, under SQLite's default variable limit
+REPLICATION_PURGE_AFTER = 10000  # applied change_log entries left on the primary before they are trimmed
+REPLICATED_TABLES = {
+    "expenditures": "date, partner, project, year, quarter, invoice_number, amount_cents, category, fund_source",
+    "metadata": "type, value",
+}
+
+
+def create_change_log(conn):
+    # Triggers record the rowid of every row written to a replicated table. They run inside the
+    # writer's transaction, so an entry is committed exactly when the change it describes is.
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT,
+            row_id INTEGER,
+            changed_at REAL
+        )
+    ''')
+    # Which history a replica is following; see sync_replica
+    cursor.execute("CREATE TABLE IF NOT EXISTS replication_source (id INTEGER PRIMARY KEY CHECK (id = 1), source_id TEXT)")
+    cursor.execute("INSERT OR IGNORE INTO replication_source (id, source_id) VALUES (1, lower(hex(randomblob(16))))")
+    now = "(julianday('now') - 2440587.5) * 86400.0"  # unix time
+    for table_name in REPLICATED_TABLES:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_log_insert AFTER INSERT ON {table_name}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, changed_at) VALUES ('{table_name}', NEW.rowid, {now});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_log_update AFTER UPDATE ON {table_name}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, changed_at) VALUES ('{table_name}', NEW.rowid, {now});
+                INSERT INTO change_log (table_name, row_id, changed_at) SELECT '{table_name}', OLD.rowid, {now} WHERE OLD.rowid != NEW.rowid;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table_name}_log_delete AFTER DELETE ON {table_name}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, changed_at) VALUES ('{table_name}', OLD.rowid, {now});
+            END
+        ''')
+    conn.commit()
+
+
+def replica_path_for(db_path):
+    # Each database has its own replica next to it: data.db -> data_replica.db
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_replica{ext or '.db'}"
+
+
+def create_replica_schema(replica):
+    replica.execute('''
+        CREATE TABLE IF NOT EXISTS expenditures (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            partner TEXT,
+            project TEXT,
+            year INTEGER,
+            quarter INTEGER,
+            invoice_number TEXT,
+            amount_cents INTEGER,
+            category TEXT,
+            fund_source TEXT
+        )
+    ''')
+    replica.execute("CREATE TABLE IF NOT EXISTS metadata (id INTEGER PRIMARY KEY, type TEXT, value TEXT)")
+    # Replicas from before source and anchor tracking can't say which primary they follow; start them over
+    columns = [column[1] for column in replica.execute("PRAGMA table_info(replication_state)").fetchall()]
+    if columns and "anchor_changed_at" not in columns:
+        replica.execute("DROP TABLE replication_state")
+    replica.execute('''
+        CREATE TABLE IF NOT EXISTS replication_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_seq INTEGER,
+            synced_at REAL,
+            source_id TEXT,
+            source_path TEXT,
+            anchor_table TEXT,
+            anchor_row_id INTEGER,
+            anchor_changed_at REAL
+        )
+    ''')
+    # Same covering index as the primary so the comparison report plans identically on the replica
+    replica.execute("CREATE INDEX IF NOT EXISTS idx_expenditures_report ON expenditures (project, category, fund_source, year, quarter, amount_cents)")
+
+
+def current_change_seq(primary):
+    sequence = primary.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return sequence[0] if sequence else 0
+
+
+def change_log_entry(primary, seq):
+    # (table_name, row_id, changed_at) of one change_log entry, all None if there is no such entry
+    entry = primary.execute("SELECT table_name, row_id, changed_at FROM change_log WHERE seq = ?", (seq,)).fetchone()
+    return entry or (None, None, None)
+
+
+def copy_replica(primary, replica, source_path):
+    # Full copy, read in one primary transaction so the rows, last_seq and source_id all match
+    primary.execute("BEGIN")
+    try:
+        source_id = primary.execute("SELECT source_id FROM replication_source").fetchone()[0]
+        current_seq = current_change_seq(primary)
+        anchor = change_log_entry(primary, current_seq)
+        replica.execute("BEGIN IMMEDIATE")
+        for table_name, columns in REPLICATED_TABLES.items():
+            replica.execute(f"DELETE FROM {table_name}")
+            replica.executemany(
+                f"INSERT INTO {table_name} (id, {columns}) VALUES (?, {', '.join('?' * len(columns.split(', ')))})",
+                primary.execute(f"SELECT rowid, {columns} FROM {table_name}"),
+            )
+        replica.execute('''
+            INSERT OR REPLACE INTO replication_state
+                (id, last_seq, synced_at, source_id, source_path, anchor_table, anchor_row_id, anchor_changed_at)
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?)
+        ''', (current_seq, time.time(), source_id, source_path) + tuple(anchor))
+        replica.execute("COMMIT")
+    except Exception:
+        if replica.in_transaction:
+            replica.execute("ROLLBACK")
+        raise
+    finally:
+        primary.execute("COMMIT")
+
+
+def sync_replica(primary_path=DB_PATH, replica_path=None, batch_size=REPLICATION_BATCH):
+    # Brings the replica up to date and returns (changes applied, changes still pending, lag in seconds).
+    # Each batch is read from the primary in one read transaction and written to the replica in one
+    # write transaction, so the replica only ever holds states the primary committed. Rows are keyed
+    # by rowid (metadata has no id column of its own on older databases). A logged rowid
+    # is resolved against the primary's current row: present means upsert, absent means delete.
+    #
+    # The replica records the primary it follows: its absolute path, its source_id and the anchor,
+    # the change_log entry at last_seq, which trimming always keeps. A different database or a moved
+    # file fails the first two checks. A restored older copy either has a lower sequence than the
+    # replica or, once it has written past last_seq again, a different entry at last_seq. Any
+    # mismatch means a full copy instead of patching by rowid. All of this is read-only on the
+    # primary, which is written to only when applied entries are trimmed.
+    #
+    # The primary must already have its schema (create_schema); that is checked, and a missing primary
+    # refused (mode=rw never creates a file), before the replica file is opened.
+    replica_path = replica_path or replica_path_for(primary_path)
+    source_path = os.path.abspath(primary_path)
+    primary = sqlite3.connect(f"file:{pathname2url(source_path)}?mode=rw", uri=True, isolation_level=None)
+    replica = None
+    try:
+        source_id = primary.execute("SELECT source_id FROM replication_source").fetchone()[0]
+        replica = sqlite3.connect(replica_path, isolation_level=None)
+        create_replica_schema(replica)
+        state = replica.execute('''
+            SELECT last_seq, source_id, source_path, anchor_table, anchor_row_id, anchor_changed_at
+            FROM replication_state
+        ''').fetchone()
+        if (
+            state is None
+            or state[1:3] != (source_id, source_path)
+            or state[0] > current_change_seq(primary)
+            or change_log_entry(primary, state[0]) != state[3:]
+        ):
+            copy_replica(primary, replica, source_path)
+
+        applied = 0
+        while True:
+            last_seq = replica.execute("SELECT last_seq FROM replication_state").fetchone()[0]
+            primary.execute("BEGIN")
+            try:
+                entries = primary.execute(
+                    "SELECT seq, table_name, row_id, changed_at FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size),
+                ).fetchall()
+                if not entries:
+                    break
+
+                changed = {table_name: set() for table_name in REPLICATED_TABLES}
+                for seq, table_name, row_id, changed_at in entries:
+                    changed[table_name].add(row_id)
+                replica.execute("BEGIN IMMEDIATE")
+                for table_name, row_ids in changed.items():
+                    if not row_ids:
+                        continue
+                    columns = REPLICATED_TABLES[table_name]
+                    row_ids = sorted(row_ids)
+                    for start in range(0, len(row_ids), REPLICATION_ID_CHUNK):
+                        chunk = row_ids[start:start + REPLICATION_ID_CHUNK]
+                        placeholders = ", ".join("?" * len(chunk))
+                        rows = primary.execute(f"SELECT rowid, {columns} FROM {table_name} WHERE rowid IN ({placeholders})", chunk).fetchall()
+                        replica.execute(f"DELETE FROM {table_name} WHERE id IN ({placeholders})", chunk)
+                        if rows:
+                            replica.executemany(f"INSERT INTO {table_name} (id, {columns}) VALUES ({', '.join('?' * len(rows[0]))})", rows)
+                replica.execute('''
+                    UPDATE replication_state
+                    SET last_seq = ?, synced_at = ?, anchor_table = ?, anchor_row_id = ?, anchor_changed_at = ?
+                ''', (entries[-1][0], time.time()) + tuple(entries[-1][1:]))
+                replica.execute("COMMIT")
+                applied += len(entries)
+            except Exception:
+                if replica.in_transaction:
+                    replica.execute("ROLLBACK")
+                raise
+            finally:
+                primary.execute("COMMIT")
+
+        # Applied entries are trimmed only once enough have built up, since the delete is a write on
+        # the primary and bumps data_version for the app; the oldest pending entry gives the lag
+        last_seq = replica.execute("SELECT last_seq FROM replication_state").fetchone()[0]
+        first_seq = primary.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        if first_seq is not None and last_seq - first_seq >= REPLICATION_PURGE_AFTER:
+            primary.execute("DELETE FROM change_log WHERE seq < ?", (last_seq,))
+        pending, oldest = primary.execute("SELECT COUNT(*), MIN(changed_at) FROM change_log WHERE seq > ?", (last_seq,)).fetchone()
+        lag = max(0.0, time.time() - oldest) if pending else 0.0
+        return applied, pending, lag
+    finally:
+        if replica is not None:
+            replica.close()
+        primary.close()
+
+
+# Online backup / scheduled snapshot settings
+BACKUP_PAGES_PER_STEP = 256      # pages copied per backup step
+BACKUP_STEP_PAUSE = 0.01         # seconds to yield to the UI connection between steps
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_INTERVAL_MS = 30 * 60 * 1000
+SNAPSHOT_KEEP = 5
+
+# Column sorting: rows fetched per page and the SQL column behind each treeview column
+PAGE_SIZE = 500
+SORT_COLUMNS = {
+    "Date": "date",
+    "Partner": "partner",
+    "Project": "project",
+    "Year": "year",
+    "Quarter": "quarter",
+    "Invoice#": "invoice_number",
+    "Amount": "amount_cents",
+    "Category": "category",
+    "Fund Source": "fund_source",
+}
+# Columns with an IFNULL() expression index. Only the usual sort orders are indexed, since every
+# index is another b-tree write per saved row; other columns sort through SQLite's LIMIT-bounded sorter.
+INDEXED_SORT_COLUMNS = ("date", "amount_cents")
+
+# Number of distinct search filter combinations kept in the result cache
+SEARCH_CACHE_SIZE = 32
+
+# Warm-start snapshot: metadata and the first page of each view, painted before the full load
+WARM_START_PATH = "project_expenditure.warm"
+WARM_START_ENABLED = True  # set to False (or run with --no-warm-start) to always load from the database
+WARM_START_FORMAT = 2
+
+# Maximum number of type-ahead suggestions shown in a metadata combobox
+AUTOCOMPLETE_LIMIT = 20
+
+# (partner, invoice_number) pairs checked per query when looking for duplicate invoices;
+# two bound variables each keeps a chunk under SQLite's default variable limit
+DUPLICATE_CHECK_CHUNK = 450
+
+# Consistency check: the columns compared between expenditures and a project table, and how many
+# differing rows are kept for display (the counts and Repair always cover every difference)
+CONSISTENCY_COLUMNS = "date, partner, year, quarter, invoice_number, amount_cents, category, fund_source"
+CONSISTENCY_DETAIL_LIMIT = 500
+
+# Budget vs actual tab; a budget for quarter 0 covers the whole year
+BUDGET_TAB = "Budget vs Actual"
+
+
+class PrefixIndex:
+    # Sorted (casefolded value, value) pairs; a prefix lookup is one bisect plus a short scan
+    def __init__(self, values=()):
+        self.entries = sorted({(value.casefold(), value) for value in values if value})
+
+    def add(self, value):
+        entry = (value.casefold(), value)
+        i = bisect.bisect_left(self.entries, entry)
+        if i == len(self.entries) or self.entries[i] != entry:
+            self.entries.insert(i, entry)
+
+    def matches(self, prefix, limit):
+        key = prefix.casefold()
+        i = bisect.bisect_left(self.entries, (key, ""))
+        results = []
+        while i < len(self.entries) and len(results) < limit and self.entries[i][0].startswith(key):
+            results.append(self.entries[i][1])
+            i += 1
+        return results
 
 
 class ProjectExpenditureTracker:
-    def __init__(self, master):
-        self.conn = sqlite3.connect("project_expenditure.db") # Ensures avoidance of conn error
+    def __init__(self, master, use_warm_start=WARM_START_ENABLED):
+        self.launch_started = time.perf_counter()
+        self.conn = open_connection() # Ensures avoidance of conn error
         self.master = master
         self.master.title("Project Expenditure Tracker")
         self.master.geometry("1200x800")
 
-        self.conn = sqlite3.connect('project_expenditure.db')
+        self.conn = open_connection()
         self.search_active = False
+        self.active_filters = None  # filters of the last search, reused when sorting
+        self.sort_state = {}  # treeview -> {"column", "descending", "last_key", "exhausted"}
+
+        # Search result cache: filter tuple -> (master rows, {project: rows}), least recently used first
+        self.search_cache = OrderedDict()
+        self.search_cache_token = None
+        self.search_cache_hits = 0
+        self.search_cache_misses = 0
+
+        # Background backup state
+        self.backup_queue = queue.Queue()
+        self.backup_thread = None
+        self.last_snapshot_counter = None
+
+        # Background initial load state
+        self.load_queue = queue.Queue()
+        self.use_warm_start = use_warm_start  # when False the snapshot is neither read nor written
+        self.first_paint_ms = None  # launch to first Expose of the notebook
+        self.records_loaded_ms = None  # launch to every record shown
+
+        # Reporting replica state
+        self.replication_queue = queue.Queue()
+        self.replica_lag = None  # seconds behind the primary after the last sync, None until synced
 
         self.style = ttk.Style()
-        # Create GUI widgets        
-        self.create_tables()        
+        # Create GUI widgets
+        self.create_tables()
         self.insert_initial_metadata()
+        self.warm_start = self.read_warm_start() if self.use_warm_start else None
+        self.started_warm = self.warm_start is not None
+        self.metadata_index = {
+            metadata_type: PrefixIndex(self.get_startup_metadata(metadata_type))
+            for metadata_type in ("partner", "project", "category", "fund_source")
+        }
         self.create_widgets()
-        # Load initial data
-        self.load_data()
+        # Load initial data; with a valid warm-start snapshot paint it first and load the rest in the background
+        if self.warm_start:
+            self.paint_warm_start()
+            self.start_background_load()
+        else:
+            self.load_data()
+            self.records_loaded_ms = (time.perf_counter() - self.launch_started) * 1000
+        self.schedule_snapshot()
+        self.schedule_replication()
+        self.notebook.bind("<Expose>", self.report_first_paint, add="+")
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Define color scheme
         self.bg_color = "#f0f0f0"
@@ -60,63 +679,19 @@ class ProjectExpenditureTracker:
             self.search_active = False  # Flag to check if search has been performed
 
     def create_tables(self):
-        cursor = self.conn.cursor()
-        
-        # Create main expenditures table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS expenditures (
-                id INTEGER PRIMARY KEY,
-                date TEXT,
-                partner TEXT,
-                project TEXT,
-                year INTEGER,
-                quarter INTEGER,
-                invoice_number TEXT,
-                amount REAL,
-                category TEXT,
-                fund_source TEXT
-            )
-        ''')
-        
-        # Create metadata table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS metadata (
-                id INTEGER PRIMARY KEY,
-                type TEXT,
-                value TEXT
-            )
-        ''')
-        
-        # Create entry log table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS entry_log (
-                id INTEGER PRIMARY KEY,
-                expenditure_id INTEGER,
-                timestamp TEXT,
-                user TEXT,
-                FOREIGN KEY (expenditure_id) REFERENCES expenditures (id)
-            )
-        ''')
+        create_schema(self.conn)
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS edit_delete_log (
-                id INTEGER PRIMARY KEY,
-                action TEXT,
-                expenditure_id INTEGER,
-                old_data TEXT,
-                new_data TEXT,
-                timestamp TEXT,
-                user TEXT
-            )
-        ''')
-        
-        self.conn.commit()
-        
         # Create project-specific tables
         projects = self.get_metadata("project")
         for project in projects:
             self.create_project_table(project)
 
+    def to_database_values(self, values):
+        # Display row (amount as text) -> row as stored (amount in integer cents)
+        values = list(values)
+        values[6] = parse_amount(values[6])
+        return values
+
     def add_fund_source_column(self):
         cursor = self.conn.cursor()
         
@@ -152,12 +727,13 @@ class ProjectExpenditureTracker:
                 year INTEGER,
                 quarter INTEGER,
                 invoice_number TEXT,
-                amount REAL,
+                amount_cents INTEGER,
                 category TEXT,
                 fund_source TEXT
             )
         ''')
         self.conn.commit()
+        create_sort_indexes(self.conn, table_name)
 
         safe_table_name = self.sanitize_table_name(project_name)
         cursor.execute(f'''
@@ -168,7 +744,7 @@ class ProjectExpenditureTracker:
                 year INTEGER,
                 quarter INTEGER,
                 invoice_number TEXT,
-                amount REAL,
+                amount_cents INTEGER,
                 category TEXT,
                 fund_source TEXT
             )
@@ -236,12 +812,12 @@ class ProjectExpenditureTracker:
 
         # Partner Combobox
         ttk.Label(entry_frame, text="Partner:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
-        self.partner_combobox = ttk.Combobox(entry_frame, values=self.get_metadata("partner"))
+        self.partner_combobox = ttk.Combobox(entry_frame, values=self.completion_values("partner"))
         self.partner_combobox.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
 
         # Project Combobox
         ttk.Label(entry_frame, text="Project:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-        self.project_combobox = ttk.Combobox(entry_frame, values=self.get_metadata("project"))
+        self.project_combobox = ttk.Combobox(entry_frame, values=self.completion_values("project"))
         self.project_combobox.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
 
         # Year Entry
@@ -267,18 +843,19 @@ class ProjectExpenditureTracker:
 
         # Category Combobox
         ttk.Label(entry_frame, text="Category:").grid(row=3, column=2, padx=5, pady=5, sticky="e")
-        self.category_combobox = ttk.Combobox(entry_frame, values=self.get_metadata("category"))
+        self.category_combobox = ttk.Combobox(entry_frame, values=self.completion_values("category"))
         self.category_combobox.grid(row=3, column=3, padx=5, pady=5, sticky="ew")
 
         # Fund Source Combobox
         ttk.Label(entry_frame, text="Fund Source:").grid(row=4, column=0, padx=5, pady=5, sticky="e")
-        self.fund_source_combobox = ttk.Combobox(entry_frame, values=self.get_metadata("fund_source"))
+        self.fund_source_combobox = ttk.Combobox(entry_frame, values=self.completion_values("fund_source"))
         self.fund_source_combobox.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
 
         # Save Button
         self.save_button = ttk.Button(entry_frame, text="Save", command=self.save_record)
         #self.save_button.grid(row=5, column=1, columnspan=2, pady=10)
         self.save_button.grid(row=len(labels), column=0, columnspan=2, pady=10)
+        ttk.Button(entry_frame, text="Batch Entry", command=self.open_batch_entry).grid(row=len(labels), column=2, columnspan=2, pady=10)
 
         # Search and Filter Frame
         self.search_frame = ttk.LabelFrame(main_frame, text="Search and Filter", padding="10")
@@ -291,25 +868,25 @@ class ProjectExpenditureTracker:
 
         # Project Search
         ttk.Label(self.search_frame, text="Project:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-        self.search_project = ttk.Combobox(self.search_frame, values=["All"] + self.get_metadata("project"))
+        self.search_project = ttk.Combobox(self.search_frame, values=["All"] + self.completion_values("project"))
         self.search_project.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         self.search_project.set("All")
 
         # Category Search
         ttk.Label(self.search_frame, text="Category:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
-        self.search_category = ttk.Combobox(self.search_frame, values=["All"] + self.get_metadata("category"))
+        self.search_category = ttk.Combobox(self.search_frame, values=["All"] + self.completion_values("category"))
         self.search_category.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
         self.search_category.set("All")
 
         # Partner Search
         ttk.Label(self.search_frame, text="Partner:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-        self.search_partner = ttk.Combobox(self.search_frame, values=["All"] + self.get_metadata("partner"))
+        self.search_partner = ttk.Combobox(self.search_frame, values=["All"] + self.completion_values("partner"))
         self.search_partner.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
         self.search_partner.set("All")
 
         # Fund Source Search
         ttk.Label(self.search_frame, text="Fund Source:").grid(row=1, column=2, padx=5, pady=5, sticky="e")
-        self.search_fund_source = ttk.Combobox(self.search_frame, values=["All"] + self.get_metadata("fund_source"))
+        self.search_fund_source = ttk.Combobox(self.search_frame, values=["All"] + self.completion_values("fund_source"))
         self.search_fund_source.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
         self.search_fund_source.set("All")
 
@@ -338,6 +915,14 @@ class ProjectExpenditureTracker:
         #ttk.Button(button_frame, text="Delete Selected", command=self.delete_record).pack(side=tk.LEFT, padx=5)
         # Add View Edit/Delete Log button
         ttk.Button(button_frame, text="View Edit/Delete Log", command=self.view_edit_delete_log).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Load More", command=self.load_next_page).pack(side=tk.LEFT, padx=5)
+
+        # Maintenance tools
+        tools_frame = ttk.Frame(self.search_frame)
+        tools_frame.grid(row=4, column=0, columnspan=4, pady=(0, 10))
+        ttk.Button(tools_frame, text="Backup Database", command=self.backup_database).pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="Duplicate Invoices", command=self.view_duplicate_report).pack(side=tk.LEFT, padx=5)
+        ttk.Button(tools_frame, text="Verify Consistency", command=self.verify_consistency).pack(side=tk.LEFT, padx=5)
         
         # Notebook for tabs
         self.notebook = ttk.Notebook(main_frame)
@@ -364,9 +949,49 @@ class ProjectExpenditureTracker:
         #scrollbar.grid(row=2, column=1, sticky="ns")
         self.tree.configure(yscrollcommand=scrollbar.set)
 
+        # Comparison report tab
+        report_frame = ttk.Frame(self.notebook)
+        self.notebook.add(report_frame, text=REPORT_TAB)
+        report_controls = ttk.Frame(report_frame)
+        report_controls.pack(fill=tk.X, pady=5)
+        ttk.Label(report_controls, text="Group by:").pack(side=tk.LEFT, padx=5)
+        self.report_dimensions = {}
+        for dim, heading in REPORT_DIMENSIONS.items():
+            self.report_dimensions[dim] = tk.BooleanVar(value=True)
+            ttk.Checkbutton(report_controls, text=heading, variable=self.report_dimensions[dim], command=self.refresh_report).pack(side=tk.LEFT, padx=5)
+        self.report_use_replica = tk.BooleanVar(value=False)
+        ttk.Checkbutton(report_controls, text="Use reporting replica", variable=self.report_use_replica, command=self.refresh_report).pack(side=tk.LEFT, padx=5)
+        ttk.Button(report_controls, text="Refresh", command=self.refresh_report).pack(side=tk.LEFT, padx=5)
+        self.report_status = ttk.Label(report_controls, text="")
+        self.report_status.pack(side=tk.LEFT, padx=10)
+        self.report_tree = ttk.Treeview(report_frame, show="headings")
+        self.report_tree.pack(side="left", fill="both", expand=True)
+        report_scrollbar = ttk.Scrollbar(report_frame, orient="vertical", command=self.report_tree.yview)
+        report_scrollbar.pack(side="right", fill="y")
+        self.report_tree.configure(yscrollcommand=report_scrollbar.set)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed, add="+")
+
+        # Budget vs actual tab
+        budget_frame = ttk.Frame(self.notebook)
+        self.notebook.add(budget_frame, text=BUDGET_TAB)
+        budget_controls = ttk.Frame(budget_frame)
+        budget_controls.pack(fill=tk.X, pady=5)
+        ttk.Button(budget_controls, text="Set Budget", command=self.set_budget).pack(side=tk.LEFT, padx=5)
+        ttk.Button(budget_controls, text="Remove Budget", command=self.remove_budget).pack(side=tk.LEFT, padx=5)
+        ttk.Button(budget_controls, text="Refresh", command=self.refresh_budgets).pack(side=tk.LEFT, padx=5)
+        self.budget_tree = ttk.Treeview(budget_frame, columns=("Project", "Fund Source", "Year", "Period", "Budget", "Spent", "Remaining", "Used"), show="headings")
+        for col in self.budget_tree["columns"]:
+            self.budget_tree.heading(col, text=col)
+            self.budget_tree.column(col, width=100)
+        self.budget_tree.tag_configure("over", background="#f8d7da")
+        self.budget_tree.pack(side="left", fill="both", expand=True)
+        budget_scrollbar = ttk.Scrollbar(budget_frame, orient="vertical", command=self.budget_tree.yview)
+        budget_scrollbar.pack(side="right", fill="y")
+        self.budget_tree.configure(yscrollcommand=budget_scrollbar.set)
+
         # Create project-specific tabs
         self.project_trees = {}
-        for project in self.get_metadata("project"):
+        for project in self.get_startup_metadata("project"):
             project_frame = ttk.Frame(self.notebook)
             self.notebook.add(project_frame, text=project)
             self.project_trees[project] = self.create_treeview(project_frame)
@@ -376,6 +1001,26 @@ class ProjectExpenditureTracker:
         self.edit_button.pack(side=tk.LEFT, padx=5)
         self.delete_button = ttk.Button(button_frame, text="Delete Selected", command=self.delete_record, state='disabled')
         self.delete_button.pack(side=tk.LEFT, padx=5)
+
+        # Status bar for background tasks
+        self.status_label = ttk.Label(main_frame, text="")
+        self.status_label.pack(fill=tk.X, pady=(5, 0))
+        self.replica_label = ttk.Label(main_frame, text="Replica: not synced yet")
+        self.replica_label.pack(fill=tk.X)
+
+        # Type-ahead completion for the metadata comboboxes: (combobox, metadata type, offers "All")
+        self.autocomplete_boxes = [
+            (self.partner_combobox, "partner", False),
+            (self.project_combobox, "project", False),
+            (self.category_combobox, "category", False),
+            (self.fund_source_combobox, "fund_source", False),
+            (self.search_project, "project", True),
+            (self.search_category, "category", True),
+            (self.search_partner, "partner", True),
+            (self.search_fund_source, "fund_source", True),
+        ]
+        for combobox, metadata_type, include_all in self.autocomplete_boxes:
+            combobox.bind("<KeyRelease>", lambda event, c=combobox, t=metadata_type, a=include_all: self.autocomplete(event, c, t, a))
     
     
     def edit_record(self):
@@ -407,6 +1052,8 @@ class ProjectExpenditureTracker:
 
         def save_changes():
             new_values = [entry.get() for entry in entries]
+            if not self.confirm_unique_invoice(new_values[1], new_values[5], previous_key=(values[1], values[5]), parent=edit_window):
+                return
             self.update_record(values, new_values, selected_item)
             edit_window.destroy()
 
@@ -414,14 +1061,19 @@ class ProjectExpenditureTracker:
 
     def update_record(self, old_values, new_values, item_id):
         try:
+            old_row = self.to_database_values(old_values)
+            new_row = self.to_database_values(new_values)
+            new_values = list(new_values)
+            new_values[6] = format_amount(new_row[6])
+
             cursor = self.conn.cursor()
 
             # Update main expenditures table
             cursor.execute('''
                 UPDATE expenditures
-                SET date=?, partner=?, project=?, year=?, quarter=?, invoice_number=?, amount=?, category=?, fund_source=?
-                WHERE date=? AND partner=? AND project=? AND year=? AND quarter=? AND invoice_number=? AND amount=? AND category=? AND fund_source=?
-            ''', new_values + old_values)
+                SET date=?, partner=?, project=?, year=?, quarter=?, invoice_number=?, amount_cents=?, category=?, fund_source=?
+                WHERE date=? AND partner=? AND project=? AND year=? AND quarter=? AND invoice_number=? AND amount_cents=? AND category=? AND fund_source=?
+            ''', new_row + old_row)
 
             # Handle project-specific tables
             old_project = old_values[2]
@@ -433,8 +1085,8 @@ class ProjectExpenditureTracker:
                 # Delete from old project table
                 cursor.execute(f'''
                     DELETE FROM {old_table_name}
-                    WHERE date=? AND partner=? AND year=? AND quarter=? AND invoice_number=? AND amount=? AND category=? AND fund_source=?
-                ''', [old_values[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]])
+                    WHERE date=? AND partner=? AND year=? AND quarter=? AND invoice_number=? AND amount_cents=? AND category=? AND fund_source=?
+                ''', [old_row[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]])
 
                 # Ensure new project table exists
                 self.ensure_project_table(new_project)
@@ -442,9 +1094,9 @@ class ProjectExpenditureTracker:
             # Insert or update in new project table
             cursor.execute(f'''
                 INSERT OR REPLACE INTO {new_table_name}
-                (date, partner, year, quarter, invoice_number, amount, category, fund_source)
+                (date, partner, year, quarter, invoice_number, amount_cents, category, fund_source)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [new_values[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]])
+            ''', [new_row[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]])
 
             self.conn.commit()
            # self.load_data()
@@ -468,6 +1120,7 @@ class ProjectExpenditureTracker:
                 self.project_trees[new_project].insert('', 'end', values=new_values)
 
             messagebox.showinfo("Success", "Record updated successfully!")
+            self.warn_if_over_budget([(new_row[2], new_row[8], new_row[3], new_row[4])])
 
             # Log the edit action
             self.log_edit_delete("edit", old_values, new_values)
@@ -493,21 +1146,22 @@ class ProjectExpenditureTracker:
             values = item['values']
 
             try:
+                row = self.to_database_values(values)
                 cursor = self.conn.cursor()
 
                 # Delete from main expenditures table
                 cursor.execute('''
                     DELETE FROM expenditures
-                    WHERE date=? AND partner=? AND project=? AND year=? AND quarter=? AND invoice_number=? AND amount=? AND category=? AND fund_source=?
-                ''', values)
+                    WHERE date=? AND partner=? AND project=? AND year=? AND quarter=? AND invoice_number=? AND amount_cents=? AND category=? AND fund_source=?
+                ''', row)
 
                 # Delete from project-specific table
                 project = values[2]
                 table_name = f"project_{self.sanitize_table_name(project)}"
                 cursor.execute(f'''
                     DELETE FROM {table_name}
-                    WHERE date=? AND partner=? AND year=? AND quarter=? AND invoice_number=? AND amount=? AND category=? AND fund_source=?
-                ''', [values[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]])
+                    WHERE date=? AND partner=? AND year=? AND quarter=? AND invoice_number=? AND amount_cents=? AND category=? AND fund_source=?
+                ''', [row[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]])
 
                 self.conn.commit()
 
@@ -540,6 +1194,7 @@ class ProjectExpenditureTracker:
             INSERT INTO edit_delete_log (action, expenditure_id, old_data, new_data, timestamp, user)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (action, None, str(old_data), str(new_data), timestamp, user))
+        self.conn.commit()
 
     def view_edit_delete_log(self):
         log_window = tk.Toplevel(self.master)
@@ -595,8 +1250,8 @@ class ProjectExpenditureTracker:
         tree.column("Fund Source", width=150)
 
         for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)  # Adjust width as needed   
+            tree.heading(col, text=col, command=lambda c=col: self.sort_by_column(tree, c))
+            tree.column(col, width=100)  # Adjust width as needed
         
         tree.pack(side="left", fill="both", expand=True)
 
@@ -614,10 +1269,13 @@ class ProjectExpenditureTracker:
             year = int(self.year_entry.get())
             quarter = int(self.quarter_combobox.get())
             invoice = self.invoice_entry.get()
-            amount = float(self.amount_entry.get())
+            amount = parse_amount(self.amount_entry.get())
             category = self.category_combobox.get()
             fund_source = self.fund_source_combobox.get()
 
+            if not self.confirm_unique_invoice(partner, invoice):
+                return
+
             # Check and add new metadata if necessary
             self.add_new_metadata("partner", partner)
             self.add_new_metadata("project", project)
@@ -628,7 +1286,7 @@ class ProjectExpenditureTracker:
             
             # Save to main expenditures table
             cursor.execute('''
-                INSERT INTO expenditures (date, partner, project, year, quarter, invoice_number, amount, category, fund_source)
+                INSERT INTO expenditures (date, partner, project, year, quarter, invoice_number, amount_cents, category, fund_source)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (date, partner, project, year, quarter, invoice, amount, category, fund_source))
             
@@ -646,149 +1304,519 @@ class ProjectExpenditureTracker:
             self.ensure_project_table(project)
             table_name = f"project_{self.sanitize_table_name(project)}"
             cursor.execute(f'''
-                INSERT INTO {table_name} (date, partner, year, quarter, invoice_number, amount, category, fund_source)
+                INSERT INTO {table_name} (date, partner, year, quarter, invoice_number, amount_cents, category, fund_source)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (date, partner, year, quarter, invoice, amount, category, fund_source))
             
             self.conn.commit()
 
             # Update master treeview
-            self.master_tree.insert('', 'end', values=(date, partner, project, year, quarter, invoice, amount, category, fund_source))
+            self.master_tree.insert('', 'end', values=(date, partner, project, year, quarter, invoice, format_amount(amount), category, fund_source))
 
             # Update or create project-specific treeview
             if project not in self.project_trees:
                 self.add_project_tab(project)
-            self.project_trees[project].insert('', 'end', values=(date, partner, project, year, quarter, invoice, amount, category, fund_source))
+            self.project_trees[project].insert('', 'end', values=(date, partner, project, year, quarter, invoice, format_amount(amount), category, fund_source))
 
             self.clear_entries()
             self.load_data()
             self.update_comboboxes()
             messagebox.showinfo("Success", "Record saved successfully!")
+            self.warn_if_over_budget([(project, fund_source, year, quarter)])
         except ValueError:
             messagebox.showerror("Error", "Invalid input. Please check your entries.")
         except sqlite3.OperationalError as e:
             messagebox.showerror("Error", f"Database error: {str(e)}")
 
+    def open_batch_entry(self):
+        batch_window = tk.Toplevel(self.master)
+        batch_window.title("Batch Data Entry")
+        batch_window.geometry("1100x600")
+
+        fields = ["Date", "Partner", "Project", "Year", "Quarter", "Invoice#", "Amount", "Category", "Fund Source"]
+        grid = ttk.Treeview(batch_window, columns=fields + ["Status"], show="headings")
+        for col in fields:
+            grid.heading(col, text=col)
+            grid.column(col, width=100)
+        grid.heading("Status", text="Status")
+        grid.column("Status", width=220)
+        grid.tag_configure("invalid", background="#f8d7da")
+        grid.tag_configure("duplicate", background="#fff3cd")
+
+        # Raw cell text per grid row; treeview values would coerce strings such as "0012" to numbers
+        rows = {}
+        status_label = ttk.Label(batch_window, text="")
+
+        def set_row(row_id, values):
+            rows[row_id] = values
+            _, error = self.validate_batch_row(values)
+            grid.item(row_id, values=values + [error or "OK"], tags=("invalid",) if error else ())
+
+        def add_row(values=None):
+            if values is None:
+                values = [datetime.now().strftime("%Y-%m-%d"), "", "", str(datetime.now().year), "", "", "", "", ""]
+            row_id = grid.insert('', 'end', values=values)
+            set_row(row_id, values)
+            return row_id
+
+        def update_status():
+            invalid = sum(1 for row_id in rows if "invalid" in grid.item(row_id, "tags"))
+            status_label['text'] = f"{len(rows)} rows, {invalid} invalid"
+
+        def open_editor(row_id, index):
+            grid.see(row_id)
+            grid.update_idletasks()
+            bbox = grid.bbox(row_id, f"#{index + 1}")
+            if not bbox:
+                return
+            x, y, width, height = bbox
+            editor = ttk.Entry(grid)
+            editor.place(x=x, y=y, width=width, height=height)
+            editor.insert(0, rows[row_id][index])
+            editor.select_range(0, tk.END)
+            editor.focus_set()
+
+            def finish(event=None):
+                if not editor.winfo_exists():
+                    return
+                values = list(rows[row_id])
+                values[index] = editor.get().strip()
+                editor.destroy()
+                set_row(row_id, values)
+                update_status()
+
+            def finish_and_advance(event):
+                finish()
+                # Keep keying without the mouse: move right, wrapping onto a new row
+                if index + 1 < len(fields):
+                    open_editor(row_id, index + 1)
+                else:
+                    next_row = grid.next(row_id) or add_row()
+                    open_editor(next_row, 0)
+                return "break"
+
+            editor.bind("<Return>", finish_and_advance)
+            editor.bind("<Tab>", finish_and_advance)
+            editor.bind("<FocusOut>", finish)
+            editor.bind("<Escape>", lambda event: editor.destroy())
+
+        def edit_cell(event):
+            row_id = grid.identify_row(event.y)
+            column = grid.identify_column(event.x)
+            if not row_id or not column:
+                return
+            index = int(column[1:]) - 1
+            if index < len(fields):
+                open_editor(row_id, index)
+
+        def paste_rows():
+            try:
+                text = batch_window.clipboard_get()
+            except tk.TclError:
+                messagebox.showwarning("Paste", "The clipboard is empty.", parent=batch_window)
+                return
+            # Spreadsheets copy cells as tab-separated lines; fall back to CSV
+            delimiter = "\t" if "\t" in text else ","
+            for cells in csv.reader(text.splitlines(), delimiter=delimiter):
+                if not any(cell.strip() for cell in cells) or cells[0].strip() == "Date":
+                    continue  # skip blank lines and a copied header row
+                cells = [cell.strip() for cell in cells[:len(fields)]]
+                add_row(cells + [""] * (len(fields) - len(cells)))
+            update_status()
+
+        def delete_rows():
+            for row_id in grid.selection():
+                grid.delete(row_id)
+                rows.pop(row_id, None)
+            update_status()
+
+        def commit_batch():
+            records = []
+            for row_id in grid.get_children():
+                record, error = self.validate_batch_row(rows[row_id])
+                if error:
+                    grid.selection_set(row_id)
+                    grid.see(row_id)
+                    messagebox.showerror("Invalid Rows", "Please fix the highlighted rows before committing.", parent=batch_window)
+                    return
+                records.append(record)
+            if not records:
+                messagebox.showwarning("Empty Batch", "There are no rows to commit.", parent=batch_window)
+                return
+
+            duplicates = self.find_batch_duplicates(records)
+            if duplicates:
+                row_ids = grid.get_children()
+                for index in duplicates:
+                    grid.item(row_ids[index], values=rows[row_ids[index]] + ["Duplicate invoice"], tags=("duplicate",))
+                if not messagebox.askyesno(
+                    "Duplicate Invoices",
+                    f"{len(duplicates)} rows repeat an invoice number already used for the same partner. Commit anyway?",
+                    parent=batch_window,
+                ):
+                    return
+
+            try:
+                elapsed = self.save_batch(records)
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Database error: {str(e)}", parent=batch_window)
+                print(f"Batch error details: {traceback.format_exc()}")
+                return
+
+            grid.delete(*grid.get_children())
+            rows.clear()
+            update_status()
+            messagebox.showinfo("Success", f"{len(records)} records saved in {elapsed * 1000:.1f} ms.", parent=batch_window)
+            self.warn_if_over_budget({(record[2], record[8], record[3], record[4]) for record in records}, parent=batch_window)
+
+        button_frame = ttk.Frame(batch_window)
+        button_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(button_frame, text="Add Row", command=lambda: (open_editor(add_row(), 0), update_status())).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Paste from Clipboard", command=paste_rows).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Delete Selected Rows", command=delete_rows).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Commit Batch", command=commit_batch).pack(side=tk.LEFT, padx=5)
+        status_label.pack(in_=button_frame, side=tk.LEFT, padx=10)
+
+        grid.pack(side="left", fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(batch_window, orient="vertical", command=grid.yview)
+        scrollbar.pack(side="right", fill="y")
+        grid.configure(yscrollcommand=scrollbar.set)
+        grid.bind("<Double-1>", edit_cell)
+        batch_window.bind("<Control-v>", lambda event: paste_rows())
+        update_status()
+
+    def validate_batch_row(self, values):
+        date, partner, project, year, quarter, invoice, amount, category, fund_source = values
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            return None, "Date must be YYYY-MM-DD"
+        if not partner:
+            return None, "Partner is required"
+        if not project:
+            return None, "Project is required"
+        try:
+            year = int(year)
+        except ValueError:
+            return None, "Year must be a number"
+        try:
+            quarter = int(quarter)
+        except ValueError:
+            return None, "Quarter must be 1-4"
+        if quarter not in (1, 2, 3, 4):
+            return None, "Quarter must be 1-4"
+        try:
+            amount = parse_amount(amount)
+        except ValueError:
+            return None, "Amount must be a number"
+        return (date, partner, project, year, quarter, invoice, amount, category, fund_source), None
+
+    def save_batch(self, records):
+        # Writes all records in a single transaction and refreshes the views once.
+        # Returns the commit latency in seconds.
+        start_time = time.perf_counter()
+
+        # DDL commits implicitly, so create any missing project tables before the transaction
+        projects = sorted({record[2] for record in records})
+        for project in projects:
+            self.ensure_project_table(project)
+
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        user = os.getenv('USERNAME', 'Unknown')
+
+        cursor = self.conn.cursor()
+        if self.conn.in_transaction:
+            self.conn.commit()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+
+            # New metadata values
+            new_metadata = []
+            for metadata_type, index in (("partner", 1), ("project", 2), ("category", 7), ("fund_source", 8)):
+                existing = set(self.get_metadata(metadata_type))
+                for value in sorted({record[index] for record in records if record[index]} - existing):
+                    new_metadata.append((metadata_type, value))
+            cursor.executemany("INSERT INTO metadata (type, value) VALUES (?, ?)", new_metadata)
+
+            # Assign ids up front so entry_log rows can reference them without per-row lastrowid
+            cursor.execute("SELECT IFNULL(MAX(id), 0) FROM expenditures")
+            first_id = cursor.fetchone()[0] + 1
+            cursor.executemany('''
+                INSERT INTO expenditures (id, date, partner, project, year, quarter, invoice_number, amount_cents, category, fund_source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(first_id + i,) + record for i, record in enumerate(records)])
+            cursor.executemany('''
+                INSERT INTO entry_log (expenditure_id, timestamp, user)
+                VALUES (?, ?, ?)
+            ''', [(first_id + i, timestamp, user) for i in range(len(records))])
+
+            for project in projects:
+                table_name = f"project_{self.sanitize_table_name(project)}"
+                cursor.executemany(f'''
+                    INSERT INTO {table_name} (date, partner, year, quarter, invoice_number, amount_cents, category, fund_source)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [tuple(record[i] for i in [0, 1, 3, 4, 5, 6, 7, 8]) for record in records if record[2] == project])
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        elapsed = time.perf_counter() - start_time
+
+        # Only offer the new values for completion once they are actually saved
+        for metadata_type, value in new_metadata:
+            self.metadata_index[metadata_type].add(value)
+
+        for project in projects:
+            if project not in self.project_trees:
+                self.add_project_tab(project)
+        self.load_data()
+        self.update_comboboxes()
+        return elapsed
+
+    def confirm_unique_invoice(self, partner, invoice, previous_key=None, parent=None):
+        # Returns True when the record may be saved; asks the user if the invoice is already on file
+        partner, invoice = str(partner), str(invoice)
+        if not invoice:
+            return True
+        if previous_key is not None and (str(previous_key[0]), str(previous_key[1])) == (partner, invoice):
+            return True  # editing a record without changing its invoice
+
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM expenditures WHERE partner=? AND invoice_number=?", (partner, invoice))
+        count = cursor.fetchone()[0]
+        if count == 0:
+            return True
+        return messagebox.askyesno(
+            "Duplicate Invoice",
+            f"Invoice {invoice} for {partner} is already recorded ({count} record(s)). Save anyway?",
+            parent=parent or self.master,
+        )
+
+    def find_existing_invoices(self, keys):
+        # One indexed lookup per chunk of (partner, invoice_number) pairs instead of one query per row
+        keys = list(keys)
+        existing = set()
+        cursor = self.conn.cursor()
+        for start in range(0, len(keys), DUPLICATE_CHECK_CHUNK):
+            chunk = keys[start:start + DUPLICATE_CHECK_CHUNK]
+            placeholders = ", ".join(["(?, ?)"] * len(chunk))
+            cursor.execute(f'''
+                SELECT DISTINCT e.partner, e.invoice_number
+                FROM (VALUES {placeholders}) AS incoming
+                JOIN expenditures e ON e.partner = incoming.column1 AND e.invoice_number = incoming.column2
+            ''', [value for key in chunk for value in key])
+            existing.update(cursor.fetchall())
+        return existing
+
+    def find_batch_duplicates(self, records):
+        # Indexes of records whose invoice is already in the database or earlier in the same batch
+        keys = [(record[1], record[5]) for record in records]
+        existing = self.find_existing_invoices({key for key in keys if key[1]})
+        seen = set()
+        duplicates = []
+        for index, key in enumerate(keys):
+            if not key[1]:
+                continue
+            if key in existing or key in seen:
+                duplicates.append(index)
+            seen.add(key)
+        return duplicates
+
+    def view_duplicate_report(self):
+        report_window = tk.Toplevel(self.master)
+        report_window.title("Duplicate Invoices")
+        report_window.geometry("900x500")
+
+        report_tree = ttk.Treeview(report_window, columns=("Partner", "Invoice#", "Count", "Total Amount", "Dates"), show="headings")
+        report_tree.heading("Partner", text="Partner")
+        report_tree.heading("Invoice#", text="Invoice#")
+        report_tree.heading("Count", text="Count")
+        report_tree.heading("Total Amount", text="Total Amount")
+        report_tree.heading("Dates", text="Dates")
+        report_tree.pack(side="left", fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(report_window, orient="vertical", command=report_tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        report_tree.configure(yscrollcommand=scrollbar.set)
+
+        # Grouping follows idx_expenditures_partner_invoice, so no sort step is needed
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT partner, invoice_number, COUNT(*), format_amount(SUM(amount_cents)), GROUP_CONCAT(date, ', ')
+            FROM expenditures
+            WHERE invoice_number IS NOT NULL AND invoice_number != ''
+            GROUP BY partner, invoice_number
+            HAVING COUNT(*) > 1
+        ''')
+        rows = cursor.fetchall()
+        for row in rows:
+            report_tree.insert('', 'end', values=row)
+        report_window.title(f"Duplicate Invoices ({len(rows)} found)")
+
     def add_new_metadata(self, metadata_type, value):
-        if value and value not in self.get_metadata(metadata_type):
-            cursor = self.conn.cursor()
+        if not value:
+            return
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM metadata WHERE type=? AND value=? LIMIT 1", (metadata_type, value))
+        if cursor.fetchone() is None:
             cursor.execute("INSERT INTO metadata (type, value) VALUES (?, ?)", (metadata_type, value))
             self.conn.commit()
+        self.metadata_index[metadata_type].add(value)
+
+    def completion_values(self, metadata_type, prefix=""):
+        return self.metadata_index[metadata_type].matches(prefix, AUTOCOMPLETE_LIMIT)
+
+    def autocomplete(self, event, combobox, metadata_type, include_all):
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return  # leave list navigation alone
+        text = combobox.get()
+        prefix = "" if include_all and text == "All" else text
+        matches = self.completion_values(metadata_type, prefix)
+        combobox['values'] = (["All"] if include_all else []) + matches
 
     def ensure_project_table(self, project_name):
+        # Called on every save, so the common case is a single catalog lookup with no DDL or commit
         table_name = f"project_{self.sanitize_table_name(project_name)}"
         cursor = self.conn.cursor()
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id INTEGER PRIMARY KEY,
-                date TEXT,
-                partner TEXT,
-                year INTEGER,
-                quarter INTEGER,
-                invoice_number TEXT,
-                amount REAL,
-                category TEXT,
-                fund_source TEXT
-            )
-        ''')
-        self.conn.commit()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+        if cursor.fetchone() is None:
+            self.create_project_table(project_name)
 
     def add_project_tab(self, project):
         project_frame = ttk.Frame(self.notebook)
         self.notebook.add(project_frame, text=project)
         self.project_trees[project] = self.create_treeview(project_frame)
 
-    def search_records(self):
-        project = self.search_project.get()
-        category = self.search_category.get()
-        partner = self.search_partner.get()
-        fund_source = self.search_fund_source.get()
-        start_date = self.search_start_date.get()
-        end_date = self.search_end_date.get()
-
-        # Clear all treeviews
-        self.master_tree.delete(*self.master_tree.get_children())
-        for tree in self.project_trees.values():
-            tree.delete(*tree.get_children())
-
-        cursor = self.conn.cursor()
-
-        # Base query for master data
-        master_query = """
-        SELECT date, partner, project, year, quarter, invoice_number, amount, category, fund_source 
-        FROM expenditures WHERE 1=1
-        """
+    def get_search_filters(self):
+        # Normalized (project, category, partner, fund_source, start_date, end_date); None means no filter
+        def normalize(value, placeholder):
+            value = value.strip()
+            return None if value in ("", placeholder) else value
+
+        return (
+            normalize(self.search_project.get(), "All"),
+            normalize(self.search_category.get(), "All"),
+            normalize(self.search_partner.get(), "All"),
+            normalize(self.search_fund_source.get(), "All"),
+            normalize(self.search_start_date.get(), "YYYY-MM-DD"),
+            normalize(self.search_end_date.get(), "YYYY-MM-DD"),
+        )
+
+    def build_filter_clause(self, filters, include_project=True):
+        project, category, partner, fund_source, start_date, end_date = filters
+        conditions = []
         params = []
-
-        # Add filter conditions
-        if project != "All":
-            master_query += " AND project = ?"
+        if include_project and project is not None:
+            conditions.append("project = ?")
             params.append(project)
-        if category != "All":
-            master_query += " AND category = ?"
+        if category is not None:
+            conditions.append("category = ?")
             params.append(category)
-        if partner != "All":
-            master_query += " AND partner = ?"
+        if partner is not None:
+            conditions.append("partner = ?")
             params.append(partner)
-        if fund_source != "All":
-            master_query += " AND fund_source = ?"
+        if fund_source is not None:
+            conditions.append("fund_source = ?")
             params.append(fund_source)
-        if start_date != "YYYY-MM-DD":
-            master_query += " AND date >= ?"
+        if start_date is not None:
+            conditions.append("date >= ?")
             params.append(start_date)
-        if end_date != "YYYY-MM-DD":
-            master_query += " AND date <= ?"
+        if end_date is not None:
+            conditions.append("date <= ?")
             params.append(end_date)
+        clause = "".join(f" AND {condition}" for condition in conditions)
+        return clause, params
 
-        # Execute master query and update master treeview
-        cursor.execute(master_query, tuple(params))
-        for row in cursor.fetchall():
-            self.master_tree.insert('', 'end', values=row)
+    def search_records(self):
+        filters = self.get_search_filters()
 
-        # Search in project-specific tables
-        for project_name, tree in self.project_trees.items():
-            table_name = f"project_{self.sanitize_table_name(project_name)}"
-            project_query = f"""
-            SELECT date, partner, ?, year, quarter, invoice_number, amount, category, fund_source 
-            FROM {table_name} WHERE 1=1
-            """
-            project_params = [project_name]
+        # Clear all treeviews
+        self.master_tree.delete(*self.master_tree.get_children())
+        for tree in self.project_trees.values():
+            tree.delete(*tree.get_children())
+        self.reset_sort_state()
 
-            # Apply filters to project-specific query
-            if project != "All" and project != project_name:
-                continue  # Skip this project if it's not the selected one
-            if category != "All":
-                project_query += " AND category = ?"
-                project_params.append(category)
-            if partner != "All":
-                project_query += " AND partner = ?"
-                project_params.append(partner)
-            if fund_source != "All":
-                project_query += " AND fund_source = ?"
-                project_params.append(fund_source)
-            if start_date != "YYYY-MM-DD":
-                project_query += " AND date >= ?"
-                project_params.append(start_date)
-            if end_date != "YYYY-MM-DD":
-                project_query += " AND date <= ?"
-                project_params.append(end_date)
-
-            # Execute project-specific query and update project treeview
-            cursor.execute(project_query, tuple(project_params))
-            for row in cursor.fetchall():
-                tree.insert('', 'end', values=row)
+        master_rows, project_rows = self.get_search_results(filters)
+        for row in master_rows:
+            self.master_tree.insert('', 'end', values=row)
+        for project_name, rows in project_rows.items():
+            tree = self.project_trees.get(project_name)
+            if tree is not None:
+                for row in rows:
+                    tree.insert('', 'end', values=row)
 
-        
         # After search is complete:
         self.search_active = True
+        self.active_filters = filters
         self.edit_button['state'] = 'normal'
         self.delete_button['state'] = 'normal'
 
         # Update status or show a message about the search results
+        stats = self.get_search_cache_stats()
+        self.status_label['text'] = f"Search cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} cached"
         total_results = len(self.master_tree.get_children())
         messagebox.showinfo("Search Results", f"Found {total_results} matching records across all projects.")
 
     
+    def get_search_results(self, filters):
+        # Local writes bump total_changes and commits from other processes bump data_version,
+        # so a change in either means every cached result may be stale.
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA data_version")
+        token = (cursor.fetchone()[0], self.conn.total_changes)
+        if token != self.search_cache_token:
+            self.search_cache.clear()
+            self.search_cache_token = token
+
+        if filters in self.search_cache:
+            self.search_cache.move_to_end(filters)
+            self.search_cache_hits += 1
+            return self.search_cache[filters]
+
+        self.search_cache_misses += 1
+        results = self.run_search_queries(filters)
+        self.search_cache[filters] = results
+        if len(self.search_cache) > SEARCH_CACHE_SIZE:
+            self.search_cache.popitem(last=False)
+        return results
+
+    def get_search_cache_stats(self):
+        return {
+            "hits": self.search_cache_hits,
+            "misses": self.search_cache_misses,
+            "size": len(self.search_cache),
+        }
+
+    def run_search_queries(self, filters):
+        project = filters[0]
+        cursor = self.conn.cursor()
+
+        # Master query
+        clause, params = self.build_filter_clause(filters)
+        master_query = f"""
+        SELECT date, partner, project, year, quarter, invoice_number, format_amount(amount_cents), category, fund_source
+        FROM expenditures WHERE 1=1{clause}
+        """
+        cursor.execute(master_query, tuple(params))
+        master_rows = cursor.fetchall()
+
+        # Search in project-specific tables
+        project_rows = {}
+        clause, params = self.build_filter_clause(filters, include_project=False)
+        for project_name in self.project_trees:
+            if project is not None and project != project_name:
+                continue  # Skip this project if it's not the selected one
+            table_name = f"project_{self.sanitize_table_name(project_name)}"
+            project_query = f"""
+            SELECT date, partner, ?, year, quarter, invoice_number, format_amount(amount_cents), category, fund_source
+            FROM {table_name} WHERE 1=1{clause}
+            """
+            cursor.execute(project_query, tuple([project_name] + params))
+            project_rows[project_name] = cursor.fetchall()
+
+        return master_rows, project_rows
+
     def reset_search(self):
         self.search_project.set("All")
         self.search_category.set("All")
@@ -802,6 +1830,7 @@ class ProjectExpenditureTracker:
 
         # After reset:
         self.search_active = False
+        self.active_filters = None
         self.edit_button['state'] = 'disabled'
         self.delete_button['state'] = 'disabled'
         self.load_data()
@@ -820,43 +1849,418 @@ class ProjectExpenditureTracker:
         self.fund_source_combobox.set('')
 
     def update_comboboxes(self):
-        partners = self.get_metadata("partner")
-        projects = self.get_metadata("project")
-        categories = self.get_metadata("category")
-        fund_sources = self.get_metadata("fund_source")
-
-        self.partner_combobox['values'] = partners
-        self.project_combobox['values'] = projects
-        self.category_combobox['values'] = categories
-        self.fund_source_combobox['values'] = fund_sources
-        self.search_project['values'] = ["All"] + projects
-        self.search_category['values'] = ["All"] + categories
-        self.search_partner['values'] = ["All"] + partners
-        self.search_fund_source['values'] = ["All"] + fund_sources
+        # The prefix indexes are updated incrementally by add_new_metadata; only refresh the suggestions
+        for combobox, metadata_type, include_all in self.autocomplete_boxes:
+            self.autocomplete(None, combobox, metadata_type, include_all)
 
     def load_data(self):
+        master_rows, project_rows = self.fetch_view_rows(self.conn)
+        self.show_view_rows(master_rows, project_rows)
+
+    def fetch_view_rows(self, conn, limit=-1):
+        # Rows for the master view and every project view, in insertion order (limit -1 means all)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT date, partner, project, year, quarter, invoice_number, format_amount(amount_cents), category, fund_source
+            FROM expenditures ORDER BY id LIMIT ?
+        ''', (limit,))
+        master_rows = cursor.fetchall()
+
+        project_rows = {}
+        for project in self.project_trees:
+            table_name = f"project_{self.sanitize_table_name(project)}"
+            cursor.execute(f"SELECT date, partner, ?, year, quarter, invoice_number, format_amount(amount_cents), category, fund_source FROM {table_name} ORDER BY id LIMIT ?", (project, limit))
+            project_rows[project] = cursor.fetchall()
+        return master_rows, project_rows
+
+    def show_view_rows(self, master_rows, project_rows):
         # Clear all treeviews
         self.master_tree.delete(*self.master_tree.get_children())
         for tree in self.project_trees.values():
             tree.delete(*tree.get_children())
-        cursor = self.conn.cursor()    
-
-        # Load data into master treeview        
-        cursor.execute("SELECT * FROM expenditures")
-        #rows = cursor.fetchall()
-        #self.tree.delete(*self.tree.get_children())
-        # for row in rows:
-        #     self.tree.insert("", "end", values=row[1:])  # Exclude ID from display
-        for row in cursor.fetchall():
-            self.master_tree.insert("", "end", values=row[1:])
+        self.reset_sort_state()
+
+        for row in master_rows:
+            self.master_tree.insert("", "end", values=row)
+        for project, rows in project_rows.items():
+            if project in self.project_trees:
+                for row in rows:
+                    self.project_trees[project].insert('', 'end', values=row)
+
+    def get_startup_metadata(self, metadata_type):
+        if self.warm_start:
+            return list(self.warm_start["metadata"].get(metadata_type, []))
+        return self.get_metadata(metadata_type)
+
+    def get_database_signature(self):
+        # Header change counter plus file size; both change whenever a commit reaches the file
+        try:
+            return self.get_change_counter(), os.path.getsize(DB_PATH)
+        except OSError:
+            return None
+
+    def read_warm_start(self):
+        # The snapshot is plain JSON, so a tampered or corrupt file can at worst cause a cold start
+        try:
+            with open(WARM_START_PATH, encoding="utf-8") as warm_file:
+                snapshot = json.load(warm_file)
+        except (OSError, ValueError, RecursionError):
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("format") != WARM_START_FORMAT:
+            return None
+        signature = self.get_database_signature()
+        if signature is None or snapshot.get("signature") != list(signature):
+            return None  # the database changed since the snapshot was taken
+
+        def valid_rows(rows):
+            return isinstance(rows, list) and all(isinstance(row, list) and len(row) == 9 for row in rows)
+
+        metadata = snapshot.get("metadata")
+        project_rows = snapshot.get("project_rows")
+        if not (
+            isinstance(metadata, dict)
+            and all(isinstance(values, list) and all(isinstance(value, str) for value in values) for values in metadata.values())
+            and valid_rows(snapshot.get("master_rows"))
+            and isinstance(project_rows, dict)
+            and all(valid_rows(rows) for rows in project_rows.values())
+        ):
+            return None
+        return snapshot
+
+    def write_warm_start(self):
+        try:
+            if self.conn.in_transaction:
+                self.conn.commit()
+            master_rows, project_rows = self.fetch_view_rows(self.conn, PAGE_SIZE)
+            snapshot = {
+                "format": WARM_START_FORMAT,
+                "signature": list(self.get_database_signature()),
+                "metadata": {
+                    metadata_type: self.get_metadata(metadata_type)
+                    for metadata_type in ("partner", "project", "category", "fund_source")
+                },
+                "master_rows": master_rows,
+                "project_rows": project_rows,
+            }
+            temp_path = WARM_START_PATH + ".part"
+            with open(temp_path, "w", encoding="utf-8") as warm_file:
+                json.dump(snapshot, warm_file)
+            os.replace(temp_path, WARM_START_PATH)
+        except Exception:
+            print(f"Warm-start snapshot error details: {traceback.format_exc()}")
+
+    def paint_warm_start(self):
+        self.show_view_rows(self.warm_start["master_rows"], self.warm_start["project_rows"])
+        self.status_label['text'] = "Loading records..."
+
+    def start_background_load(self):
+        # Read every row on a worker thread with its own connection; the treeviews are filled on the UI thread
+        changes_at_start = self.conn.total_changes
+
+        def worker():
+            try:
+                conn = open_connection()
+                try:
+                    self.load_queue.put(("done", self.fetch_view_rows(conn)))
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Background load error details: {traceback.format_exc()}")
+                self.load_queue.put(("error", str(e)))
 
+        threading.Thread(target=worker, daemon=True).start()
+        self.master.after(50, lambda: self.poll_background_load(changes_at_start))
 
-        # Load data into project-specific treeviews
-        for project in self.project_trees:
-            table_name = f"project_{self.sanitize_table_name(project)}"
-            cursor.execute(f"SELECT date, partner, ?, year, quarter, invoice_number, amount, category, fund_source FROM {table_name}", (project,))
-            for row in cursor.fetchall():
-                self.project_trees[project].insert('', 'end', values=row)
+    def poll_background_load(self, changes_at_start):
+        try:
+            event, result = self.load_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(50, lambda: self.poll_background_load(changes_at_start))
+            return
+
+        if event == "done" and self.conn.total_changes == changes_at_start:
+            self.show_view_rows(*result)
+        else:
+            # A local write happened meanwhile (or the worker failed); reload synchronously instead
+            self.load_data()
+        self.update_comboboxes()
+        self.warm_start = None
+        self.records_loaded_ms = (time.perf_counter() - self.launch_started) * 1000
+        self.show_startup_timing()
+
+    def report_first_paint(self, event):
+        if self.first_paint_ms is not None:
+            return
+        self.first_paint_ms = (time.perf_counter() - self.launch_started) * 1000
+        self.show_startup_timing()
+
+    def show_startup_timing(self):
+        parts = []
+        if self.first_paint_ms is not None:
+            parts.append(f"First paint after {self.first_paint_ms:.0f} ms ({'warm' if self.started_warm else 'cold'} start)")
+        if self.records_loaded_ms is not None:
+            parts.append(f"records loaded in {self.records_loaded_ms:.0f} ms")
+        elif self.warm_start:
+            parts.append("loading records...")
+        text = "; ".join(parts)
+        self.status_label['text'] = text[:1].upper() + text[1:]
+
+    def on_close(self):
+        if self.use_warm_start:
+            self.write_warm_start()
+        self.master.destroy()
+
+    def sort_by_column(self, tree, column):
+        state = self.sort_state.get(tree)
+        descending = bool(state and state["column"] == column and not state["descending"])
+        self.sort_state[tree] = {"column": column, "descending": descending, "last_key": None, "exhausted": False}
+
+        for col in tree["columns"]:
+            arrow = (" \u25bc" if descending else " \u25b2") if col == column else ""
+            tree.heading(col, text=col + arrow)
+
+        tree.delete(*tree.get_children())
+        self.fetch_sorted_page(tree)
+
+    def load_next_page(self):
+        current_tab = self.notebook.tab(self.notebook.select(), "text")
+        tree = self.master_tree if current_tab == "Master Record" else self.project_trees.get(current_tab)
+        state = self.sort_state.get(tree)
+        if state is None:
+            messagebox.showinfo("Load More", "All rows are already shown. Click a column heading to sort page by page.")
+            return
+        if state["exhausted"]:
+            messagebox.showinfo("Load More", "No more rows to load.")
+            return
+        self.fetch_sorted_page(tree)
+
+    def fetch_sorted_page(self, tree):
+        # Keyset pagination: each page continues after the (sort value, id) of the last row shown,
+        # so no rows are skipped with OFFSET. Unfiltered date and amount sorts seek straight into
+        # their expression index. Other columns, and filtered views where SQLite reads rows through
+        # a filter index instead, go through a sorter; with LIMIT it keeps only the best PAGE_SIZE
+        # matching rows, but it still visits every match.
+        state = self.sort_state[tree]
+        sort_expr = f"IFNULL({SORT_COLUMNS[state['column']]}, '')"
+        direction = "DESC" if state["descending"] else "ASC"
+        filters = self.active_filters or (None,) * 6
+
+        if tree is self.master_tree:
+            table_name = "expenditures"
+            select = "date, partner, project, year, quarter, invoice_number, format_amount(amount_cents), category, fund_source"
+            select_params = []
+            clause, params = self.build_filter_clause(filters)
+        else:
+            project_name = next(name for name, project_tree in self.project_trees.items() if project_tree is tree)
+            if filters[0] is not None and filters[0] != project_name:
+                state["exhausted"] = True
+                return
+            table_name = f"project_{self.sanitize_table_name(project_name)}"
+            select = "date, partner, ?, year, quarter, invoice_number, format_amount(amount_cents), category, fund_source"
+            select_params = [project_name]
+            if state["column"] == "Project":
+                sort_expr = "''"  # constant within a project table; order falls back to id
+            clause, params = self.build_filter_clause(filters, include_project=False)
+
+        if state["last_key"] is not None:
+            bound, compare = ("<=", "<") if state["descending"] else (">=", ">")
+            # The redundant single-column bound lets SQLite seek an expression index where there is one
+            clause += f" AND {sort_expr} {bound} ? AND ({sort_expr}, id) {compare} (?, ?)"
+            params = params + [state["last_key"][0], state["last_key"][0], state["last_key"][1]]
+
+        query = f'''
+            SELECT id, {sort_expr}, {select}
+            FROM {table_name} WHERE 1=1{clause}
+            ORDER BY {sort_expr} {direction}, id {direction}
+            LIMIT ?
+        '''
+        cursor = self.conn.cursor()
+        cursor.execute(query, tuple(select_params + params + [PAGE_SIZE]))
+        rows = cursor.fetchall()
+        for row in rows:
+            tree.insert('', 'end', values=row[2:])
+
+        if rows:
+            state["last_key"] = (rows[-1][1], rows[-1][0])
+        state["exhausted"] = len(rows) < PAGE_SIZE
+
+    def reset_sort_state(self):
+        for tree in self.sort_state:
+            for col in tree["columns"]:
+                tree.heading(col, text=col)
+        self.sort_state = {}
+
+    def on_tab_changed(self, event):
+        current_tab = self.notebook.tab(self.notebook.select(), "text")
+        if current_tab == REPORT_TAB:
+            self.refresh_report()
+        elif current_tab == BUDGET_TAB:
+            self.refresh_budgets()
+
+    def refresh_report(self):
+        dims = [dim for dim, selected in self.report_dimensions.items() if selected.get()]
+        use_replica = self.report_use_replica.get()
+        replica_path = replica_path_for(DB_PATH)
+        if use_replica and not os.path.exists(replica_path):
+            messagebox.showwarning("Replica Not Ready", "The reporting replica has not been created yet; try again in a few seconds.")
+            self.report_use_replica.set(False)
+            use_replica = False
+        try:
+            start_time = time.perf_counter()
+            if use_replica:
+                conn = open_connection(replica_path, read_only=True)
+                try:
+                    headers, rows = comparison_report(conn, dims)
+                finally:
+                    conn.close()
+            else:
+                headers, rows = comparison_report(self.conn, dims)
+            elapsed = time.perf_counter() - start_time
+        except sqlite3.Error as e:
+            messagebox.showerror("Report Error", f"Database error: {str(e)}")
+            print(f"Report error details: {traceback.format_exc()}")
+            return
+
+        self.report_tree.delete(*self.report_tree.get_children())
+        self.report_tree["columns"] = headers
+        for col in headers:
+            self.report_tree.heading(col, text=col)
+            self.report_tree.column(col, width=100)
+        for row in rows:
+            self.report_tree.insert('', 'end', values=format_report_row(row, len(dims)))
+        self.report_status['text'] = f"{len(rows)} periods in {elapsed * 1000:.0f} ms"
+        if use_replica:
+            self.report_status['text'] += f" from the replica ({self.describe_replica_lag()})"
+
+    def check_budgets(self, keys):
+        # Budgets exceeded for the given (project, fund_source, year, quarter) keys, read from the
+        # running counters: two primary-key lookups per key (the quarter and the whole year)
+        cursor = self.conn.cursor()
+        exceeded = []
+        for project, fund_source, year, quarter in keys:
+            cursor.execute('''
+                SELECT b.quarter, b.amount_cents, IFNULL(s.spent_cents, 0)
+                FROM budgets b
+                LEFT JOIN budget_spent s
+                    ON s.project = b.project AND s.fund_source = b.fund_source AND s.year = b.year AND s.quarter = b.quarter
+                WHERE b.project = ? AND b.fund_source = ? AND b.year = ? AND b.quarter IN (0, ?)
+            ''', (project or "", fund_source or "", year, quarter))
+            for budget_quarter, budget, spent in cursor.fetchall():
+                if spent > budget:
+                    exceeded.append((project, fund_source, year, budget_quarter, budget, spent))
+        return exceeded
+
+    def warn_if_over_budget(self, keys, parent=None):
+        exceeded = self.check_budgets(keys)
+        if not exceeded:
+            return
+        lines = [
+            f"{project} / {fund_source or '(no fund source)'}, {self.budget_period(quarter)} {year}: "
+            f"spent {format_amount(spent)} of {format_amount(budget)} ({format_amount(spent - budget)} over)"
+            for project, fund_source, year, quarter, budget, spent in exceeded
+        ]
+        messagebox.showwarning("Over Budget", "\n".join(lines), parent=parent or self.master)
+
+    def budget_period(self, quarter):
+        return "Annual" if quarter == 0 else f"Q{quarter}"
+
+    def refresh_budgets(self):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT b.project, b.fund_source, b.year, b.quarter, b.amount_cents, IFNULL(s.spent_cents, 0)
+            FROM budgets b
+            LEFT JOIN budget_spent s
+                ON s.project = b.project AND s.fund_source = b.fund_source AND s.year = b.year AND s.quarter = b.quarter
+            ORDER BY b.project, b.fund_source, b.year, b.quarter
+        ''')
+        self.budget_tree.delete(*self.budget_tree.get_children())
+        for project, fund_source, year, quarter, budget, spent in cursor.fetchall():
+            used = f"{spent * 100 / budget:.0f}%" if budget else ""
+            self.budget_tree.insert('', 'end', values=(
+                project, fund_source, year, self.budget_period(quarter),
+                format_amount(budget), format_amount(spent), format_amount(budget - spent), used,
+            ), tags=("over",) if spent > budget else ())
+
+    def set_budget(self):
+        budget_window = tk.Toplevel(self.master)
+        budget_window.title("Set Budget")
+
+        ttk.Label(budget_window, text="Project:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        project_combobox = ttk.Combobox(budget_window, values=self.get_metadata("project"))
+        project_combobox.grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(budget_window, text="Fund Source:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+        fund_source_combobox = ttk.Combobox(budget_window, values=self.get_metadata("fund_source"))
+        fund_source_combobox.grid(row=1, column=1, padx=5, pady=5)
+        ttk.Label(budget_window, text="Year:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+        year_entry = ttk.Entry(budget_window)
+        year_entry.insert(0, str(datetime.now().year))
+        year_entry.grid(row=2, column=1, padx=5, pady=5)
+        ttk.Label(budget_window, text="Period:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
+        period_combobox = ttk.Combobox(budget_window, values=["Annual", "Q1", "Q2", "Q3", "Q4"], state="readonly")
+        period_combobox.set("Annual")
+        period_combobox.grid(row=3, column=1, padx=5, pady=5)
+        ttk.Label(budget_window, text="Amount:").grid(row=4, column=0, padx=5, pady=5, sticky="e")
+        amount_entry = ttk.Entry(budget_window)
+        amount_entry.grid(row=4, column=1, padx=5, pady=5)
+
+        # Start from the selected budget, if any, so it can be adjusted
+        selected = self.budget_tree.selection()
+        if selected:
+            project, fund_source, year, period, budget = self.budget_tree.item(selected[0])["values"][:5]
+            project_combobox.set(str(project))
+            fund_source_combobox.set(str(fund_source))
+            year_entry.delete(0, tk.END)
+            year_entry.insert(0, year)
+            period_combobox.set(period)
+            amount_entry.insert(0, budget)
+
+        def save_budget():
+            try:
+                project = project_combobox.get()
+                fund_source = fund_source_combobox.get()
+                year = int(year_entry.get())
+                period = period_combobox.get()
+                quarter = 0 if period == "Annual" else int(period[1:])
+                amount = parse_amount(amount_entry.get())
+            except ValueError:
+                messagebox.showerror("Error", "Invalid input. Please check your entries.", parent=budget_window)
+                return
+            if not project or not fund_source:
+                messagebox.showerror("Error", "Project and fund source are required.", parent=budget_window)
+                return
+
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                    INSERT INTO budgets (project, fund_source, year, quarter, amount_cents)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (project, fund_source, year, quarter) DO UPDATE SET amount_cents = excluded.amount_cents
+                ''', (project, fund_source, year, quarter, amount))
+                self.conn.commit()
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"Database error: {str(e)}", parent=budget_window)
+                print(f"Budget error details: {traceback.format_exc()}")
+                return
+            budget_window.destroy()
+            self.refresh_budgets()
+
+        ttk.Button(budget_window, text="Save Budget", command=save_budget).grid(row=5, column=0, columnspan=2, pady=10)
+
+    def remove_budget(self):
+        selected = self.budget_tree.selection()
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select a budget to remove.")
+            return
+        if not messagebox.askyesno("Confirm Remove", f"Remove {len(selected)} budget(s)? Recorded expenditures are not affected."):
+            return
+
+        cursor = self.conn.cursor()
+        for item in selected:
+            project, fund_source, year, period = self.budget_tree.item(item)["values"][:4]
+            quarter = 0 if period == "Annual" else int(period[1:])
+            cursor.execute("DELETE FROM budgets WHERE project=? AND fund_source=? AND year=? AND quarter=?", (str(project), str(fund_source), year, quarter))
+        self.conn.commit()
+        self.refresh_budgets()
 
     def export_data(self):
         try:
@@ -875,10 +2279,14 @@ class ProjectExpenditureTracker:
 
             if current_tab == "Master Record":
                 tree = self.master_tree
+            elif current_tab == REPORT_TAB:
+                tree = self.report_tree
+            elif current_tab == BUDGET_TAB:
+                tree = self.budget_tree
             else:
                 tree = self.project_trees[current_tab]
             
-            headers = [tree.heading(col)["text"] for col in tree["columns"]]
+            headers = list(tree["columns"])
             data = []
             for item in tree.get_children():
                 values = tree.item(item)["values"]
@@ -913,7 +2321,7 @@ class ProjectExpenditureTracker:
 
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT entry_log.id, entry_log.timestamp, entry_log.user, expenditures.project, expenditures.amount
+            SELECT entry_log.id, entry_log.timestamp, entry_log.user, expenditures.project, format_amount(expenditures.amount_cents)
             FROM entry_log
             JOIN expenditures ON entry_log.expenditure_id = expenditures.id
             ORDER BY entry_log.timestamp DESC
@@ -921,6 +2329,357 @@ class ProjectExpenditureTracker:
         for row in cursor.fetchall():
             log_tree.insert('', 'end', values=row)
 
+    def check_consistency(self):
+        # Compares expenditures with every project table without sorting either side. One scan of
+        # each table folds every row into a per-date bucket of (row count, sum of row hashes), which
+        # doesn't depend on row order; only dates whose buckets differ are read again, through the
+        # date index, and compared row by row.
+        cursor = self.conn.cursor()
+        if self.conn.in_transaction:
+            self.conn.commit()
+
+        cursor.execute("SELECT DISTINCT project FROM expenditures WHERE project IS NOT NULL AND project != ''")
+        projects = {row[0] for row in cursor.fetchall()} | set(self.get_metadata("project"))
+        tables = {}
+        for project in sorted(projects):
+            tables.setdefault(f"project_{self.sanitize_table_name(project)}", []).append(project)
+        project_tables = {project: table_name for table_name, table_projects in tables.items() for project in table_projects}
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'project_%'")
+        existing_tables = {row[0] for row in cursor.fetchall()}
+
+        mask = (1 << 64) - 1
+
+        def add_row(buckets, row):
+            date = "" if row[0] is None else row[0]
+            count, total = buckets.get(date, (0, 0))
+            buckets[date] = (count + 1, (total + hash(row)) & mask)
+
+        master_buckets = {table_name: {} for table_name in tables}
+        cursor.execute(f"SELECT project, {CONSISTENCY_COLUMNS} FROM expenditures WHERE project IS NOT NULL AND project != ''")
+        for row in cursor:
+            add_row(master_buckets[project_tables[row[0]]], row[1:])
+
+        results = []
+        details_left = CONSISTENCY_DETAIL_LIMIT
+        for table_name, table_projects in sorted(tables.items()):
+            table_exists = table_name in existing_tables
+            project_buckets = {}
+            if table_exists:
+                cursor.execute(f"SELECT {CONSISTENCY_COLUMNS} FROM {table_name}")
+                for row in cursor:
+                    add_row(project_buckets, row)
+
+            master = master_buckets[table_name]
+            result = {
+                "table": table_name,
+                "projects": table_projects,
+                "master_count": sum(count for count, total in master.values()),
+                "project_count": sum(count for count, total in project_buckets.values()),
+                "missing": 0,
+                "extra": 0,
+                "mismatched": 0,
+                "dates": [],
+                "details": [],
+            }
+            drifted_dates = [date for date in master.keys() | project_buckets.keys() if master.get(date) != project_buckets.get(date)]
+            for date in sorted(drifted_dates, key=str):
+                missing, extra = self.diff_consistency_bucket(table_name, table_projects, table_exists, date)
+                if not missing and not extra:
+                    continue
+                result["dates"].append(date)
+                result["missing"] += sum(missing.values())
+                result["extra"] += sum(extra.values())
+
+                # A missing and an extra row with the same date, partner and invoice are one edited record
+                missing_keys = Counter()
+                for row, count in missing.items():
+                    missing_keys[(row[1], row[4])] += count
+                for row, count in extra.items():
+                    paired = min(count, missing_keys[(row[1], row[4])])
+                    missing_keys[(row[1], row[4])] -= paired
+                    result["mismatched"] += paired
+
+                for issue, rows in (("Missing from project table", missing), ("Extra in project table", extra)):
+                    for row, count in rows.items():
+                        if len(result["details"]) < details_left:
+                            result["details"].append((issue, row, count))
+            details_left -= len(result["details"])
+            results.append(result)
+
+        orphan_tables = sorted(existing_tables - set(tables))
+        return results, orphan_tables
+
+    def diff_consistency_bucket(self, table_name, projects, table_exists, date):
+        # Row-by-row comparison of one date; returns (missing, extra) as Counters of rows
+        cursor = self.conn.cursor()
+        placeholders = ", ".join("?" * len(projects))
+        cursor.execute(f'''
+            SELECT {CONSISTENCY_COLUMNS} FROM expenditures
+            WHERE IFNULL(date, '') = ? AND project IN ({placeholders})
+        ''', [date] + list(projects))
+        expected = Counter(cursor.fetchall())
+        actual = Counter()
+        if table_exists:
+            cursor.execute(f"SELECT {CONSISTENCY_COLUMNS} FROM {table_name} WHERE IFNULL(date, '') = ?", (date,))
+            actual = Counter(cursor.fetchall())
+        return expected - actual, actual - expected
+
+    def repair_consistency(self, results):
+        # Makes each project table match expenditures, in a single transaction. Each differing date
+        # is compared again inside the transaction, so only rows that still differ are rewritten.
+        for result in results:
+            if result["missing"]:
+                self.ensure_project_table(result["projects"][0])
+
+        cursor = self.conn.cursor()
+        if self.conn.in_transaction:
+            self.conn.commit()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for result in results:
+                table_name = result["table"]
+                for date in result["dates"]:
+                    missing, extra = self.diff_consistency_bucket(table_name, result["projects"], True, date)
+                    for row, count in extra.items():
+                        cursor.execute(f'''
+                            DELETE FROM {table_name} WHERE id IN (
+                                SELECT id FROM {table_name}
+                                WHERE date IS ? AND partner IS ? AND year IS ? AND quarter IS ?
+                                  AND invoice_number IS ? AND amount_cents IS ? AND category IS ? AND fund_source IS ?
+                                LIMIT ?
+                            )
+                        ''', row + (count,))
+                    cursor.executemany(f'''
+                        INSERT INTO {table_name} ({CONSISTENCY_COLUMNS})
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', [row for row, count in missing.items() for _ in range(count)])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def verify_consistency(self):
+        try:
+            results, orphan_tables = self.check_consistency()
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Database error: {str(e)}")
+            print(f"Consistency check error details: {traceback.format_exc()}")
+            return
+
+        check_window = tk.Toplevel(self.master)
+        check_window.title("Consistency Check")
+        check_window.geometry("1000x600")
+
+        summary_tree = ttk.Treeview(check_window, columns=("Project", "Table", "Master Rows", "Project Rows", "Missing", "Extra", "Mismatched"), show="headings", height=8)
+        for col in summary_tree["columns"]:
+            summary_tree.heading(col, text=col)
+            summary_tree.column(col, width=120)
+        summary_tree.pack(fill="x", padx=5, pady=5)
+
+        detail_tree = ttk.Treeview(check_window, columns=("Issue", "Table", "Date", "Partner", "Year", "Quarter", "Invoice#", "Amount", "Category", "Fund Source", "Count"), show="headings")
+        for col in detail_tree["columns"]:
+            detail_tree.heading(col, text=col)
+            detail_tree.column(col, width=85)
+        detail_tree.pack(fill="both", expand=True, padx=5)
+
+        drifted = [result for result in results if result["missing"] or result["extra"]]
+        differing_rows = listed_rows = 0
+        for result in results:
+            summary_tree.insert('', 'end', values=(
+                ", ".join(result["projects"]), result["table"], result["master_count"], result["project_count"],
+                result["missing"] - result["mismatched"], result["extra"] - result["mismatched"], result["mismatched"],
+            ))
+            for issue, row, count in result["details"]:
+                detail_tree.insert('', 'end', values=(issue, result["table"]) + row[:5] + (format_amount(row[5]),) + row[6:] + (count,))
+                listed_rows += count
+            differing_rows += result["missing"] + result["extra"]
+        for table_name in orphan_tables:
+            summary_tree.insert('', 'end', values=("(no project)", table_name, 0, "", "", "", ""))
+
+        status = f"{len(drifted)} of {len(results)} project tables differ from the master record."
+        if listed_rows < differing_rows:
+            status += f" Listing {listed_rows} of {differing_rows} differing rows; Repair fixes all of them."
+        if orphan_tables:
+            status += f" {len(orphan_tables)} project tables have no matching project and are left untouched."
+        ttk.Label(check_window, text=status).pack(fill="x", padx=5, pady=5)
+
+        def repair():
+            if not messagebox.askyesno("Confirm Repair", "Rewrite the differing project table rows to match the master record?", parent=check_window):
+                return
+            try:
+                self.repair_consistency(drifted)
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", f"An error occurred while repairing: {str(e)}", parent=check_window)
+                print(f"Repair error details: {traceback.format_exc()}")
+                return
+            check_window.destroy()
+            self.load_data()
+            messagebox.showinfo("Success", f"Repaired {len(drifted)} project tables.")
+
+        if drifted:
+            ttk.Button(check_window, text="Repair", command=repair).pack(pady=5)
+
+    def backup_database(self):
+        if self.backup_thread and self.backup_thread.is_alive():
+            messagebox.showwarning("Backup Running", "A backup is already in progress.")
+            return
+
+        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = filedialog.asksaveasfilename(
+            initialfile=f"project_expenditure_backup_{current_datetime}.db",
+            defaultextension=".db",
+            filetypes=[("SQLite database", "*.db")]
+        )
+        if not file_path:
+            return
+        if os.path.abspath(file_path) == os.path.abspath(DB_PATH):
+            messagebox.showerror("Backup Error", "Choose a file other than the live database.")
+            return
+
+        self.start_backup(file_path, "backup")
+
+    def start_backup(self, target_path, kind):
+        self.backup_thread = threading.Thread(target=self.run_backup, args=(target_path, kind), daemon=True)
+        self.backup_thread.start()
+        self.master.after(100, self.poll_backup_progress)
+
+    def run_backup(self, target_path, kind):
+        # Runs on a worker thread with its own connections; the UI connection is never shared.
+        # The copy is written to a .part file first so an interrupted backup never looks complete.
+        temp_path = target_path + ".part"
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            source = sqlite3.connect(DB_PATH)
+            target = sqlite3.connect(temp_path)
+
+            def progress(status, remaining, total):
+                self.backup_queue.put(("progress", kind, total - remaining, total))
+                # Throttle between steps so save_record/search_records can take their locks
+                time.sleep(BACKUP_STEP_PAUSE)
+
+            try:
+                source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress)
+            finally:
+                target.close()
+                source.close()
+            os.replace(temp_path, target_path)
+            self.backup_queue.put(("done", kind, target_path, None))
+        except Exception as e:
+            print(f"Backup error details: {traceback.format_exc()}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.backup_queue.put(("error", kind, str(e), None))
+
+    def poll_backup_progress(self):
+        while True:
+            try:
+                event, kind, first, second = self.backup_queue.get_nowait()
+            except queue.Empty:
+                break
+            label = "Snapshot" if kind == "snapshot" else "Backup"
+            if event == "progress":
+                percent = int(first * 100 / second) if second else 100
+                self.status_label['text'] = f"{label} in progress: {percent}% ({first}/{second} pages)"
+            elif event == "done":
+                self.status_label['text'] = f"{label} completed {datetime.now().strftime('%H:%M:%S')}: {first}"
+                if kind == "snapshot":
+                    self.rotate_snapshots()
+                else:
+                    messagebox.showinfo("Backup Successful", f"Database backed up successfully to {first}")
+            elif event == "error":
+                self.status_label['text'] = f"{label} failed: {first}"
+                if kind == "snapshot":
+                    self.last_snapshot_counter = None  # retry on the next run
+                else:
+                    messagebox.showerror("Backup Error", f"An error occurred while backing up: {first}")
+
+        if (self.backup_thread and self.backup_thread.is_alive()) or not self.backup_queue.empty():
+            self.master.after(100, self.poll_backup_progress)
+
+    def schedule_snapshot(self):
+        if SNAPSHOT_INTERVAL_MS > 0:
+            self.master.after(SNAPSHOT_INTERVAL_MS, self.take_snapshot)
+
+    def take_snapshot(self):
+        try:
+            if self.backup_thread and self.backup_thread.is_alive():
+                return  # a backup is running; try again next interval
+
+            # Skip the snapshot entirely when nothing was committed since the last one
+            counter = self.get_change_counter()
+            if counter is not None and counter == self.last_snapshot_counter:
+                return
+
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+            snapshot_path = os.path.join(SNAPSHOT_DIR, f"project_expenditure_{current_datetime}.db")
+            self.last_snapshot_counter = counter
+            self.start_backup(snapshot_path, "snapshot")
+        except Exception as e:
+            print(f"Snapshot error details: {traceback.format_exc()}")
+        finally:
+            self.schedule_snapshot()
+
+    def rotate_snapshots(self):
+        snapshots = sorted(
+            name for name in os.listdir(SNAPSHOT_DIR)
+            if name.startswith("project_expenditure_") and name.endswith(".db")
+        )
+        for name in snapshots[:-SNAPSHOT_KEEP]:
+            os.remove(os.path.join(SNAPSHOT_DIR, name))
+
+    def get_change_counter(self):
+        # File change counter from the database header (offset 24), bumped by SQLite on every commit
+        try:
+            with open(DB_PATH, "rb") as db_file:
+                header = db_file.read(28)
+        except OSError:
+            return None
+        if len(header) < 28:
+            return None
+        return struct.unpack(">I", header[24:28])[0]
+
+    def schedule_replication(self):
+        if REPLICATION_INTERVAL_MS > 0:
+            self.master.after(REPLICATION_INTERVAL_MS, self.start_replication)
+
+    def start_replication(self):
+        # Sync on a worker thread with its own connections, like the backups
+        def worker():
+            try:
+                self.replication_queue.put(("done", sync_replica()))
+            except Exception as e:
+                print(f"Replication error details: {traceback.format_exc()}")
+                self.replication_queue.put(("error", str(e)))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.master.after(100, self.poll_replication)
+
+    def poll_replication(self):
+        try:
+            event, result = self.replication_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(100, self.poll_replication)
+            return
+
+        if event == "done":
+            applied, pending, self.replica_lag = result
+            self.replica_label['text'] = f"Replica: {self.describe_replica_lag()}, last synced {datetime.now().strftime('%H:%M:%S')}"
+            if pending:
+                self.replica_label['text'] += f" ({pending} changes pending)"
+        else:
+            self.replica_label['text'] = f"Replica sync failed: {result}"
+        self.schedule_replication()
+
+    def describe_replica_lag(self):
+        if self.replica_lag is None:
+            return "not synced yet"
+        if self.replica_lag == 0:
+            return "up to date"
+        return f"{self.replica_lag:.0f} s behind"
+
     def get_metadata(self, metadata_type):
         cursor = self.conn.cursor()
         cursor.execute("SELECT value FROM metadata WHERE type=?", (metadata_type,))
@@ -933,9 +2692,68 @@ class ProjectExpenditureTracker:
         return "".join(c.lower() if c.isalnum() else "_" for c in name)
 
 # Main execution
+def prepare_database(path):
+    # Command-line entry points: refuse a missing file, which sqlite3 would silently create empty,
+    # and bring an older database up to the current schema before anything reads it
+    if not os.path.isfile(path):
+        sys.exit(f"No database at {path}")
+    conn = open_connection(path)
+    try:
+        create_schema(conn)
+    finally:
+        conn.close()
+
+
+def run_report(args):
+    # Headless comparison report as CSV on stdout
+    requested = [dim.strip() for dim in args.group_by.split(",") if dim.strip()]
+    unknown = [dim for dim in requested if dim not in REPORT_DIMENSIONS]
+    if unknown:
+        sys.exit(f"Unknown report dimension(s): {', '.join(unknown)}")
+    dims = [dim for dim in REPORT_DIMENSIONS if dim in requested]
+
+    if args.replica:
+        # Only the replica that follows --db, as recorded by sync_replica
+        replica_path = replica_path_for(args.db)
+        if not os.path.exists(replica_path):
+            sys.exit(f"No replica at {replica_path}; run with --sync-replica first")
+        conn = open_connection(replica_path, read_only=True)
+        state = conn.execute("SELECT source_path FROM replication_state").fetchone()
+        if state is None or state[0] != os.path.abspath(args.db):
+            conn.close()
+            sys.exit(f"{replica_path} does not follow {args.db}; run with --sync-replica first")
+    else:
+        prepare_database(args.db)
+        conn = open_connection(args.db)
+    try:
+        headers, rows = comparison_report(conn, dims)
+    finally:
+        conn.close()
+    writer = csv.writer(sys.stdout)
+    writer.writerow(headers)
+    writer.writerows(format_report_row(row, len(dims)) for row in rows)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Project Expenditure Tracker")
+    parser.add_argument("--report", action="store_true", help="print the quarterly comparison report as CSV and exit")
+    parser.add_argument("--group-by", default=",".join(REPORT_DIMENSIONS), help="comma-separated report dimensions (project, category, fund_source)")
+    parser.add_argument("--db", default=DB_PATH, help="database file to report on")
+    parser.add_argument("--replica", action="store_true", help="run the report against the reporting replica of --db instead of --db itself")
+    parser.add_argument("--sync-replica", action="store_true", help="bring the reporting replica of --db up to date and exit")
+    parser.add_argument("--no-warm-start", action="store_true", help="don't paint from or save the warm-start snapshot")
+    args = parser.parse_args()
+    if args.sync_replica:
+        prepare_database(args.db)
+        applied, pending, lag = sync_replica(args.db)
+        print(f"Applied {applied} changes to {replica_path_for(args.db)}; {pending} pending, lag {lag:.1f} s")
+        return
+    if args.report:
+        run_report(args)
+        return
+
     root = tk.Tk()
-    app = ProjectExpenditureTracker(root)
+    app = ProjectExpenditureTracker(root, use_warm_start=WARM_START_ENABLED and not args.no_warm_start)
     root.mainloop()
 
 if __name__ == "__main__":
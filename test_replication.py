@@ -0,0 +1,201 @@
+# Convergence tests for the reporting replica (change_log triggers + sync_replica).
+#
+#   python -m pytest test_replication.py      or      python -m unittest test_replication
+#
+# Every database lives in a temporary directory; the working database is never touched.
+import importlib.util
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "projexp-reporting.py")
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("projexp_reporting", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+app = load_app()
+
+
+class ReplicationTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.primary_path = os.path.join(self.workdir, "primary.db")
+        self.conn = self.create_primary(self.primary_path, "Project X", 200)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.workdir)
+
+    def create_primary(self, path, project, rows):
+        # Same shapes as the app's tables; metadata without an id column, as in older databases
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE expenditures (
+                id INTEGER PRIMARY KEY, date TEXT, partner TEXT, project TEXT, year INTEGER, quarter INTEGER,
+                invoice_number TEXT, amount_cents INTEGER, category TEXT, fund_source TEXT
+            )
+        ''')
+        conn.execute("CREATE TABLE metadata (type TEXT, value TEXT)")
+        conn.executemany(
+            "INSERT INTO expenditures (date, partner, project, year, quarter, invoice_number, amount_cents, category, fund_source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [("2024-01-15", f"Partner {i % 7}", project, 2024, 1 + i % 4, f"INV-{i}", i * 100, "Services", "Source A") for i in range(rows)],
+        )
+        conn.executemany("INSERT INTO metadata (type, value) VALUES (?, ?)", [("partner", f"Partner {i}") for i in range(7)])
+        conn.commit()
+        app.create_change_log(conn)
+        return conn
+
+    def snapshot(self, path, id_column):
+        conn = sqlite3.connect(path)
+        try:
+            return (
+                conn.execute(f"SELECT {id_column}, * FROM expenditures ORDER BY 1").fetchall(),
+                conn.execute(f"SELECT {id_column}, type, value FROM metadata ORDER BY 1").fetchall(),
+            )
+        finally:
+            conn.close()
+
+    def assert_converged(self, replica_path=None):
+        replica_path = replica_path or app.replica_path_for(self.primary_path)
+        primary_expenditures, primary_metadata = self.snapshot(self.primary_path, "rowid")
+        replica_expenditures, replica_metadata = self.snapshot(replica_path, "id")
+        # The replica's metadata has an explicit id column holding the primary's rowid
+        self.assertEqual([row[1:] for row in primary_expenditures], [row[1:] for row in replica_expenditures])
+        self.assertEqual(primary_metadata, replica_metadata)
+
+    def random_changes(self, rng, count):
+        for _ in range(count):
+            ids = [row[0] for row in self.conn.execute("SELECT id FROM expenditures")]
+            op = rng.random()
+            if op < 0.35 or not ids:
+                self.conn.execute(
+                    "INSERT INTO expenditures (date, partner, project, year, quarter, invoice_number, amount_cents, category, fund_source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ("2024-02-01", f"Partner {rng.randrange(7)}", rng.choice(["Project X", "Project Y"]), 2024, rng.randint(1, 4), f"NEW-{rng.random()}", rng.randint(-500, 10**6), "Equipment", rng.choice(["Source A", None])),
+                )
+            elif op < 0.55:
+                self.conn.execute("UPDATE expenditures SET amount_cents = ?, project = ? WHERE id = ?", (rng.randint(0, 10**6), rng.choice(["Project X", "Project Z"]), rng.choice(ids)))
+            elif op < 0.6:
+                self.conn.execute("UPDATE OR IGNORE expenditures SET id = ? WHERE id = ?", (rng.randint(1, 5000), rng.choice(ids)))
+            elif op < 0.65:
+                self.conn.execute("INSERT OR REPLACE INTO expenditures (id, date, amount_cents) VALUES (?, '2020-01-01', 1)", (rng.choice(ids),))
+            elif op < 0.85:
+                self.conn.execute("DELETE FROM expenditures WHERE id = ?", (rng.choice(ids),))
+            elif op < 0.92:
+                self.conn.execute("INSERT INTO metadata (type, value) VALUES ('partner', ?)", (f"Partner {rng.random()}",))
+            else:
+                self.conn.execute("DELETE FROM metadata WHERE rowid IN (SELECT rowid FROM metadata ORDER BY random() LIMIT 1)")
+            if rng.random() < 0.2:
+                self.conn.commit()
+        # Some rounds are abandoned; rolled-back changes must never reach the replica
+        if rng.random() < 0.3:
+            self.conn.rollback()
+        else:
+            self.conn.commit()
+
+    def test_converges_after_random_inserts_edits_and_deletes(self):
+        # Trim after every sync, so convergence is also checked against a log trimmed to its anchor
+        self.addCleanup(setattr, app, "REPLICATION_PURGE_AFTER", app.REPLICATION_PURGE_AFTER)
+        app.REPLICATION_PURGE_AFTER = 0
+        rng = random.Random(1)
+        for _ in range(40):
+            self.random_changes(rng, rng.randint(0, 80))
+            applied, pending, lag = app.sync_replica(self.primary_path, batch_size=rng.choice([1, 7, 50, 1000]))
+            self.assertEqual(pending, 0)
+            self.assertEqual(lag, 0.0)
+            self.assert_converged()
+        # Applied entries are purged from the primary, except the one at last_seq
+        replica = sqlite3.connect(app.replica_path_for(self.primary_path))
+        last_seq = replica.execute("SELECT last_seq FROM replication_state").fetchone()[0]
+        replica.close()
+        self.assertEqual(self.conn.execute("SELECT seq FROM change_log").fetchall(), [(last_seq,)])
+
+    def test_incremental_sync_does_not_write_to_primary(self):
+        app.sync_replica(self.primary_path)
+        self.conn.execute("UPDATE expenditures SET amount_cents = 1 WHERE id <= 10")
+        self.conn.commit()
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self.assertEqual(app.sync_replica(self.primary_path)[:2], (10, 0))
+        self.assertEqual(self.conn.execute("PRAGMA data_version").fetchone()[0], data_version)
+        self.assert_converged()
+
+    def test_pending_changes_are_reported_until_synced(self):
+        app.sync_replica(self.primary_path)
+        self.conn.execute("DELETE FROM expenditures WHERE id <= 10")
+        self.conn.commit()
+        replica = sqlite3.connect(app.replica_path_for(self.primary_path))
+        self.assertEqual(replica.execute("SELECT COUNT(*) FROM expenditures").fetchone()[0], 200)
+        replica.close()
+        self.assertEqual(app.sync_replica(self.primary_path)[:2], (10, 0))
+        self.assert_converged()
+
+    def test_different_primary_is_copied_in_full(self):
+        replica_path = os.path.join(self.workdir, "shared_replica.db")
+        app.sync_replica(self.primary_path, replica_path)
+        other_path = os.path.join(self.workdir, "other.db")
+        other = self.create_primary(other_path, "Other", 30)
+        other.close()
+
+        app.sync_replica(other_path, replica_path)
+        replica = sqlite3.connect(replica_path)
+        self.assertEqual(replica.execute("SELECT project, COUNT(*) FROM expenditures GROUP BY project").fetchall(), [("Other", 30)])
+        replica.close()
+
+    def test_restored_backup_that_caught_up_is_copied_in_full(self):
+        rng = random.Random(2)
+        app.sync_replica(self.primary_path)
+        self.conn.close()
+        backup_path = os.path.join(self.workdir, "backup.db")
+        shutil.copy(self.primary_path, backup_path)
+
+        self.conn = sqlite3.connect(self.primary_path)
+        self.random_changes(rng, 50)
+        self.conn.commit()
+        app.sync_replica(self.primary_path)
+        self.conn.close()
+
+        # Restore the backup, then write more than was lost so its sequence overtakes the replica's
+        shutil.copy(backup_path, self.primary_path)
+        self.conn = sqlite3.connect(self.primary_path)
+        for _ in range(100):
+            self.conn.execute("UPDATE expenditures SET project = 'Restored' WHERE id = ?", (rng.randint(1, 200),))
+        self.conn.commit()
+        app.sync_replica(self.primary_path)
+        self.assert_converged()
+
+    def test_missing_or_unprepared_primary_creates_no_files(self):
+        missing_path = os.path.join(self.workdir, "typo.db")
+        with self.assertRaises(sqlite3.OperationalError):
+            app.sync_replica(missing_path)
+        self.assertFalse(os.path.exists(missing_path))
+        self.assertFalse(os.path.exists(app.replica_path_for(missing_path)))
+
+        bare_path = os.path.join(self.workdir, "bare.db")
+        sqlite3.connect(bare_path).close()
+        with self.assertRaises(sqlite3.OperationalError):
+            app.sync_replica(bare_path)
+        self.assertFalse(os.path.exists(app.replica_path_for(bare_path)))
+
+    def test_replica_path_follows_database(self):
+        self.assertEqual(app.replica_path_for("project_expenditure.db"), "project_expenditure_replica.db")
+        self.assertEqual(app.replica_path_for(os.path.join("data", "copy.db")), os.path.join("data", "copy_replica.db"))
+
+    def test_replica_connection_is_read_only(self):
+        app.sync_replica(self.primary_path)
+        conn = app.open_connection(app.replica_path_for(self.primary_path), read_only=True)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM expenditures")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()